@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import hashlib
+import threading
+import zipfile
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+# Локальная замена GitHub API для бенчмарков: contents (папки), commits (и по пути), zipball (с Range),
+# git/trees и git/blobs — ровно то, чем пользуется endlinkerio_core
+
+OWNER_REPO = "bench/modpacks"
+BRANCH = "master"
+SEND_CHUNK_SIZE = 1024 * 1024
+
+def git_blob_sha(path):
+    h = hashlib.sha1(b"blob %d\0" % os.path.getsize(path))
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(SEND_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class FakeRepo:
+    def __init__(self, repo_path, work_path):
+        self.repo_path = repo_path
+        self.files = {}  # путь в репозитории -> путь на диске
+        for dirpath, _, filenames in os.walk(repo_path):
+            for filename in filenames:
+                full_path = os.path.join(dirpath, filename)
+                self.files[os.path.relpath(full_path, repo_path).replace(os.sep, "/")] = full_path
+
+        self.blobs = {}
+        self.blob_of = {}
+        for path, full_path in sorted(self.files.items()):
+            sha = git_blob_sha(full_path)
+            self.blobs[sha] = full_path
+            self.blob_of[path] = sha
+
+        self.trees = {}
+        self.root = self.build_tree("")
+        self.commit = hashlib.sha1(self.root.encode()).hexdigest()
+        self.zip_path = os.path.join(work_path, f"{self.commit}.zip")
+        self.zip_lock = threading.Lock()
+
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def build_tree(self, prefix):
+        children = {}
+        for path in self.files:
+            if path.startswith(prefix):
+                rest = path[len(prefix):].split("/")
+                children.setdefault(rest[0], len(rest) > 1)
+        items = []
+        for name, is_dir in sorted(children.items()):
+            if is_dir:
+                items.append({"path": name, "mode": "040000", "type": "tree", "sha": self.build_tree(prefix + name + "/")})
+            else:
+                path = prefix + name
+                items.append({"path": name, "mode": "100644", "type": "blob", "sha": self.blob_of[path],
+                              "size": os.path.getsize(self.files[path])})
+        # SHA дерева как у Git: по нему установка сверяет манифест модпака
+        body = b"".join(
+            (b"40000 " if item["type"] == "tree" else b"100644 ") + item["path"].encode() + b"\0" + bytes.fromhex(item["sha"])
+            for item in sorted(items, key=lambda item: item["path"].encode() + (b"/" if item["type"] == "tree" else b""))
+        )
+        sha = hashlib.sha1(b"tree %d\0" % len(body) + body).hexdigest()
+        self.trees[sha] = items
+        return sha
+
+    def recursive_tree(self, sha):
+        result = []
+        for item in self.trees[sha]:
+            result.append(item)
+            if item["type"] == "tree":
+                for child in self.recursive_tree(item["sha"]):
+                    result.append({**child, "path": item["path"] + "/" + child["path"]})
+        return result
+
+    def zipball(self):
+        # Как у GitHub: корневая папка "<владелец>-<репозиторий>-<sha>/", затем папки и файлы по алфавиту
+        with self.zip_lock:
+            if not os.path.isfile(self.zip_path):
+                root = f"{OWNER_REPO.replace('/', '-')}-{self.commit[:7]}/"
+                tmp_path = self.zip_path + ".tmp"
+                with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as z:
+                    z.writestr(root, "")
+                    written_dirs = set()
+                    for path in sorted(self.files):
+                        parts = path.split("/")
+                        for i in range(1, len(parts)):
+                            dir_path = "/".join(parts[:i]) + "/"
+                            if dir_path not in written_dirs:
+                                written_dirs.add(dir_path)
+                                z.writestr(root + dir_path, "")
+                        z.write(self.files[path], root + path)
+                os.replace(tmp_path, self.zip_path)
+        return self.zip_path
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.stats = {"requests": 0, "bytes": 0}
+
+    def count(self, sent_bytes=0, requests=0):
+        with self.stats_lock:
+            self.stats["bytes"] += sent_bytes
+            self.stats["requests"] += requests
+
+def make_handler(repo):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send_body(self, code, body, content_type="application/json", headers=()):
+            if isinstance(body, (dict, list)):
+                body = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+            repo.count(len(body))
+
+        def send_file(self, path, content_type="application/octet-stream", etag=None):
+            size = os.path.getsize(path)
+            start, end = 0, size - 1
+            match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+            if match and self.headers.get("If-Range") in (None, etag):
+                start = int(match.group(1))
+                if match.group(2):
+                    end = min(end, int(match.group(2)))
+                if start >= size or start > end:
+                    return self.send_body(416, b"", headers=[("Content-Range", f"bytes */{size}")])
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(end + 1 - start))
+            if etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            with open(path, "rb") as f:
+                f.seek(start)
+                remaining = end + 1 - start
+                while remaining:
+                    chunk = f.read(min(SEND_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+                    repo.count(len(chunk))
+
+        def do_GET(self):
+            repo.count(requests=1)
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            match = re.match(rf"/repos/{OWNER_REPO}/(.*)", unquote(url.path))
+            rest = match.group(1) if match else ""
+
+            if rest.startswith("contents/"):
+                items = self.folder_items(rest[len("contents/"):])
+                if items is None:
+                    return self.send_body(404, {"message": "Not Found"})
+                return self.send_body(200, [{"name": item["path"], "sha": item["sha"],
+                                             "type": "dir" if item["type"] == "tree" else "file"} for item in items])
+            if rest == "commits":
+                # История одна: последний коммит любой папки — единственный коммит репозитория
+                return self.send_body(200, [{"sha": repo.commit}])
+            if rest.startswith("commits/"):
+                etag = f'"{repo.commit}"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self.send_body(304, b"", headers=[("ETag", etag)])
+                return self.send_body(200, repo.commit.encode(), "text/plain", [("ETag", etag)])
+            if rest.startswith("zipball/"):
+                return self.send_file(repo.zipball(), "application/zip", f'"{repo.commit}"')
+            if rest.startswith("git/trees/"):
+                sha = rest[len("git/trees/"):]
+                if sha not in repo.trees:
+                    sha = repo.root  # имя ветки
+                etag = f'"{sha}"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self.send_body(304, b"", headers=[("ETag", etag)])
+                tree = repo.recursive_tree(sha) if query.get("recursive") else repo.trees[sha]
+                return self.send_body(200, {"sha": sha, "tree": tree, "truncated": False}, headers=[("ETag", etag)])
+            if rest.startswith("git/blobs/"):
+                sha = rest[len("git/blobs/"):]
+                if sha in repo.blobs:
+                    return self.send_file(repo.blobs[sha])
+            self.send_body(404, {"message": "Not Found"})
+
+        def folder_items(self, path):
+            items = repo.trees[repo.root]
+            for name in path.split("/"):
+                for item in items:
+                    if item["path"] == name and item["type"] == "tree":
+                        items = repo.trees[item["sha"]]
+                        break
+                else:
+                    return None
+            return items
+
+    return Handler
+
+def serve(repo, host="127.0.0.1", port=0):
+    # Возвращает (сервер, базовый URL вместо https://api.github.com)
+    server = ThreadingHTTPServer((host, port), make_handler(repo))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
@@ -0,0 +1,222 @@
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+
+BENCH_PATH = os.path.dirname(os.path.abspath(__file__))
+ROOT_PATH = os.path.dirname(BENCH_PATH)
+sys.path.insert(0, ROOT_PATH)
+sys.path.insert(0, BENCH_PATH)
+
+import synthetic
+import fake_github
+
+# Замер установки на синтетических модпаках с локальным сервером вместо GitHub:
+#   python bench/run_bench.py                                  — сценарии по умолчанию, оба FETCH_MODE
+#   python bench/run_bench.py --scenarios mods-1000,world-2gb --fetch-modes tree
+#   python bench/run_bench.py compare bench/results/OLD.json bench/results/NEW.json
+# Каждая установка идёт в отдельном процессе, чтобы пиковая память не копилась между прогонами.
+# "cold" — пустые .minecraft и кэш, "warm" — повтор поверх (кэш архива и инкрементальная синхронизация)
+
+RESULTS_PATH = os.path.join(BENCH_PATH, "results")
+DEFAULT_WORKDIR = os.path.join(tempfile.gettempdir(), "endlinkerio-bench")
+
+def peak_rss():
+    # Пиковая память процесса в байтах; None, если узнать нечем
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    except (ImportError, AttributeError):
+        return None
+
+def point_core_at(core, base_url, minecraft_path, cache_path, fetch_mode):
+    core.MINECRAFT_PATH = minecraft_path
+    core.FETCH_MODE = fetch_mode
+    core.API_REPO_URL = f"{base_url}/repos/{fake_github.OWNER_REPO}"
+    core.GITHUB_API_URL = f"{core.API_REPO_URL}/contents/modpacks"
+    core.COMMIT_URL = f"{core.API_REPO_URL}/commits/{fake_github.BRANCH}"
+    core.BRANCH = fake_github.BRANCH
+    # Зеркало из локальной сети не должно попасть в замер, а поиск его — во время установки
+    core.MIRROR_DISCOVERY = False
+    core.MIRROR_URL = None
+    core.CACHE_PATH = cache_path
+    core.ARCHIVE_CACHE_PATH = os.path.join(cache_path, "archives")
+    core.HASH_INDEX_PATH = os.path.join(cache_path, "hashes.json")
+    core.MODPACK_LIST_CACHE_PATH = os.path.join(cache_path, "modpacks.json")
+    core.INSTALLED_STATE_PATH = os.path.join(cache_path, "installed.json")
+    core.JAVA_CACHE_PATH = os.path.join(cache_path, "java.json")
+    core.LOADER_CACHE_PATH = os.path.join(cache_path, "loaders.json")
+    core.PROFILES_STATE_PATH = os.path.join(cache_path, "profiles.json")
+    core.API_CACHE_PATH = os.path.join(cache_path, "api")
+    core.RATE_LIMIT_STATE_PATH = os.path.join(cache_path, "ratelimit.json")
+    core.TRACE_PATH = os.path.join(cache_path, "traces")
+    core._github_token = "bench"
+
+def run_child(args):
+    # Одна установка в этом процессе; результат — JSON в stdout
+    import endlinkerio_core as core
+
+    # stdout только для результата; print из установки уходят в stderr
+    output = sys.stdout
+    sys.stdout = sys.stderr
+    point_core_at(core, args.base_url, args.minecraft_path, args.cache_path, args.fetch_mode)
+    phases = []
+    last = {}
+
+    def on_progress(snapshot):
+        if not phases or phases[-1][0] != snapshot["phase"]:
+            phases.append((snapshot["phase"], time.perf_counter()))
+        last.update(snapshot)
+
+    installer = core.Installer(synthetic.PACK_NAME, log=lambda message: None, on_progress=on_progress)
+    started = time.perf_counter()
+    installer.install()
+    finished = time.perf_counter()
+
+    phase_times = {}
+    for (name, phase_started), (_, phase_finished) in zip(phases, phases[1:] + [("end", finished)]):
+        phase_times[name] = phase_times.get(name, 0.0) + phase_finished - phase_started
+    phase_times.pop("done", None)
+    json.dump({
+        "seconds": finished - started,
+        "phases": phase_times,
+        "written_bytes": last.get("written_bytes", 0),
+        "peak_rss": peak_rss(),
+    }, output)
+    return 0
+
+def git_revision():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_PATH,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+        return result.stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_install(repo, base_url, minecraft_path, cache_path, fetch_mode):
+    repo.reset_stats()
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "child",
+         "--base-url", base_url, "--minecraft-path", minecraft_path,
+         "--cache-path", cache_path, "--fetch-mode", fetch_mode],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Установка упала:\n{result.stderr.decode(errors='replace')}")
+    measured = json.loads(result.stdout)
+    measured["transferred_bytes"] = repo.stats["bytes"]
+    measured["requests"] = repo.stats["requests"]
+    return measured
+
+def run_suite(args):
+    scenarios = args.scenarios.split(",") if args.scenarios else synthetic.DEFAULT_SCENARIOS
+    fetch_modes = args.fetch_modes.split(",")
+    os.makedirs(args.workdir, exist_ok=True)
+    results = []
+    for scenario in scenarios:
+        print(f"[{scenario}] сборка репозитория...", file=sys.stderr)
+        repo_path = synthetic.build_repo(scenario, args.workdir)
+        repo = fake_github.FakeRepo(repo_path, os.path.join(args.workdir, "repos"))
+        repo.zipball()  # архив собирается заранее, а не во время замера
+        server, base_url = fake_github.serve(repo)
+        try:
+            for fetch_mode in fetch_modes:
+                run_path = os.path.join(args.workdir, "runs", f"{scenario}-{fetch_mode}")
+                shutil.rmtree(run_path, ignore_errors=True)
+                minecraft_path = os.path.join(run_path, ".minecraft")
+                cache_path = os.path.join(run_path, "cache")
+                for run in ("cold", "warm"):
+                    measured = run_install(repo, base_url, minecraft_path, cache_path, fetch_mode)
+                    row = {"scenario": scenario, "fetch_mode": fetch_mode, "run": run, **measured}
+                    results.append(row)
+                    print(format_row(row), file=sys.stderr)
+                shutil.rmtree(run_path, ignore_errors=True)
+        finally:
+            server.shutdown()
+
+    revision = git_revision()
+    report = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_PATH, time.strftime("%Y%m%d-%H%M%S") + (f"-{revision}" if revision else "") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Результаты: {output}", file=sys.stderr)
+    return 0
+
+def format_row(row):
+    rss = f"{row['peak_rss'] / (1024 * 1024):.0f} МБ" if row.get("peak_rss") else "?"
+    phases = " ".join(f"{name}={seconds:.2f}" for name, seconds in row["phases"].items())
+    return (f"{row['scenario']:<14} {row['fetch_mode']:<8} {row['run']:<5} {row['seconds']:8.2f} с "
+            f"сеть {row['transferred_bytes'] / (1024 * 1024):9.1f} МБ  запросов {row['requests']:<5} "
+            f"RSS {rss:<8} {phases}")
+
+def compare(args):
+    # Время и трафик новой версии относительно старой по каждому прогону
+    with open(args.old, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    old_rows = {(row["scenario"], row["fetch_mode"], row["run"]): row for row in old["results"]}
+    print(f"{old.get('revision')} -> {new.get('revision')}")
+    for row in new["results"]:
+        key = (row["scenario"], row["fetch_mode"], row["run"])
+        before = old_rows.get(key)
+        if before is None:
+            print(f"{' '.join(key):<30} новый прогон: {row['seconds']:.2f} с")
+            continue
+        time_change = (row["seconds"] / before["seconds"] - 1) * 100 if before["seconds"] else 0.0
+        print(f"{' '.join(key):<30} {before['seconds']:8.2f} -> {row['seconds']:8.2f} с ({time_change:+.1f}%)  "
+              f"сеть {before['transferred_bytes'] / (1024 * 1024):.1f} -> "
+              f"{row['transferred_bytes'] / (1024 * 1024):.1f} МБ")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="run_bench", description="Бенчмарк установки модпаков")
+    commands = parser.add_subparsers(dest="command")
+
+    parser.add_argument("--scenarios", help="через запятую: " + ", ".join(synthetic.SCENARIOS))
+    parser.add_argument("--fetch-modes", default="zipball,tree")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR, help="где хранить сгенерированные репозитории")
+    parser.add_argument("--output", help="файл результатов (по умолчанию bench/results/<время>-<коммит>.json)")
+
+    compare_parser = commands.add_parser("compare", help="сравнить два файла результатов")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+
+    child = commands.add_parser("child")
+    child.add_argument("--base-url", required=True)
+    child.add_argument("--minecraft-path", required=True)
+    child.add_argument("--cache-path", required=True)
+    child.add_argument("--fetch-mode", required=True)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "child":
+        return run_child(args)
+    if args.command == "compare":
+        return compare(args)
+    return run_suite(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import random
+import shutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import endlinkerio_core
+
+# Синтетические репозитории модпаков в раскладке modpacks/<Имя> (ver. x.y.z)/.
+# Содержимое детерминировано по seed, поэтому собранный раз репозиторий переиспользуется
+
+PACK_NAME = "Bench (ver. 1.0.0)"
+# Второй модпак лежит рядом, как в настоящем репозитории: zipball качает и его
+OTHER_PACK_NAME = "Other (ver. 1.0.0)"
+
+MB = 1024 * 1024
+
+SCENARIOS = {
+    "mods-50": {"mods": 50},
+    "mods-300": {"mods": 300},
+    "mods-1000": {"mods": 1000},
+    "resourcepacks": {"mods": 50, "resourcepacks": 3, "resourcepack_size": 150 * MB},
+    "world-2gb": {"mods": 50, "world_regions": 200, "region_size": 10 * MB},
+}
+# Многогигабайтный мир собирается долго — только по явному запросу
+DEFAULT_SCENARIOS = ["mods-50", "mods-300", "mods-1000", "resourcepacks"]
+
+MOD_SIZE_RANGE = (20 * 1024, 4 * MB)
+OTHER_PACK_MODS = 20
+CONFIG_FILES = 40
+
+def write_random_file(path, size, rng):
+    # Случайные байты не сжимаются — как jar и region-файлы
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        while size > 0:
+            chunk = min(size, MB)
+            f.write(rng.randbytes(chunk))
+            size -= chunk
+
+def write_config_file(path, index, rng):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {f"option_{i}": rng.choice([True, False, rng.randint(0, 1000), "value"]) for i in range(200)}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"config": index, "values": data}, f, indent=2)
+
+def mod_size(rng):
+    # Много маленьких модов и немного больших, как в реальных сборках
+    low, high = MOD_SIZE_RANGE
+    return int(low * (high / low) ** (rng.random() ** 2))
+
+def generate_pack(pack_path, spec, rng):
+    for i in range(spec.get("mods", 0)):
+        write_random_file(os.path.join(pack_path, "mods", f"mod-{i:04d}-1.0.jar"), mod_size(rng), rng)
+    for i in range(CONFIG_FILES):
+        write_config_file(os.path.join(pack_path, "config", f"mod-{i:04d}.json"), i, rng)
+    for i in range(spec.get("resourcepacks", 0)):
+        write_random_file(os.path.join(pack_path, "resourcepacks", f"textures-{i}.zip"),
+                          spec["resourcepack_size"], rng)
+    regions = spec.get("world_regions", 0)
+    if regions:
+        world_path = os.path.join(pack_path, "saves", "Bench World")
+        side = int(regions ** 0.5) + 1
+        for i in range(regions):
+            x, z = divmod(i, side)
+            write_random_file(os.path.join(world_path, "region", f"r.{x}.{z}.mca"), spec["region_size"], rng)
+        write_random_file(os.path.join(world_path, "level.dat"), 4096, rng)
+
+def build_repo(scenario, workdir):
+    # Возвращает папку репозитория; пересобирается, только если поменялось описание сценария
+    spec = SCENARIOS[scenario]
+    repo_path = os.path.join(workdir, "repos", scenario)
+    marker_path = repo_path + ".json"
+    marker = {"scenario": scenario, "spec": spec, "mod_size_range": MOD_SIZE_RANGE,
+              "manifest": endlinkerio_core.MANIFEST_VERSION}
+    try:
+        with open(marker_path, "r", encoding="utf-8") as f:
+            if json.load(f) == json.loads(json.dumps(marker)):
+                return repo_path
+    except (OSError, ValueError):
+        pass
+
+    rng = random.Random(scenario)
+    if os.path.isdir(repo_path):
+        shutil.rmtree(repo_path)
+    os.makedirs(repo_path)
+    with open(os.path.join(repo_path, "README.md"), "w", encoding="utf-8") as f:
+        f.write(f"# {scenario}\n")
+    generate_pack(os.path.join(repo_path, "modpacks", PACK_NAME), spec, rng)
+    # У основного модпака есть манифест, как после "endlinkerio_cli.py manifest"
+    endlinkerio_core.write_manifest(os.path.join(repo_path, "modpacks", PACK_NAME))
+    generate_pack(os.path.join(repo_path, "modpacks", OTHER_PACK_NAME), {"mods": OTHER_PACK_MODS}, rng)
+    with open(marker_path, "w", encoding="utf-8") as f:
+        json.dump(marker, f)
+    return repo_path
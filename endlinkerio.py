@@ -1,98 +1,43 @@
+import time
+STARTUP_STARTED = time.perf_counter()
+
 import sys
 import os
-import re
-import requests
-import zipfile
-import io
-import shutil
-import getpass
-import glob
-import subprocess
 from math import ceil
+from collections import deque
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton,
     QVBoxLayout, QHBoxLayout, QFrame, QMessageBox, QCheckBox, 
-    QSizePolicy, QSpacerItem, QProgressBar, QPlainTextEdit, QWidget
+    QSizePolicy, QSpacerItem, QProgressBar, QPlainTextEdit, QWidget, QInputDialog
 )
 from PySide6.QtGui import QFontDatabase, QFont, QIcon, QPainter, QColor, QPen
-from PySide6.QtCore import Qt, QObject, Signal, QThread, QTimer, QRect, QPropertyAnimation, QSettings, QEasingCurve
-
-from cryptography.fernet import Fernet
-import nbtlib
-from nbtlib import tag
-
-GITHUB_REPO = "USERNAME/PRIVATEREPO"
-BRANCH = "master"
-GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_REPO}/contents/modpacks"
-ZIP_URL = f"https://api.github.com/repos/{GITHUB_REPO}/zipball/{BRANCH}"
+from PySide6.QtCore import Qt, QObject, Signal, QThread, QTimer, QRect, QPropertyAnimation, QSettings, QEasingCurve, QEvent
 
-USERNAME = getpass.getuser()
-MINECRAFT_PATH = os.path.join("C:\\Users", USERNAME, "AppData", "Roaming", ".minecraft")
-
-def resource_path(relative_path):
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
-
-def read_github_token():
-    token_path = resource_path("penny.txt")
-    if not os.path.isfile(token_path):
-        QMessageBox.critical(None, "Ошибка", f"Файл с токеном {token_path} не найден!")
-        
-        sys.exit(1)
-    with open(token_path, "r", encoding="utf-8") as f:
-        return f.read().strip()
-
-GITHUB_TOKEN = read_github_token()
-HEADERS = {
-    "Authorization": f"token {GITHUB_TOKEN}",
-    "Accept": "application/vnd.github.v3+json"
-}
-
-def fetch_modpack_list():
-    try:
-        response = requests.get(GITHUB_API_URL, headers=HEADERS)
-        response.raise_for_status()
-        folders = [item['name'] for item in response.json() if item['type'] == 'dir']
-        return folders
-    except Exception as e:
-        QMessageBox.warning(None, "Ошибка", f"Не удалось получить список модпаков:\n{e}")
-        return []
-
-def rename_mods_folder(minecraft_path):
-    mods_path = os.path.join(minecraft_path, "mods")
-    if not os.path.exists(mods_path):
-        return
-
-    index = 1
-    while True:
-        new_name = f"mods-{index}"
-        new_path = os.path.join(minecraft_path, new_name)
-        if not os.path.exists(new_path):
-            try:
-                os.rename(mods_path, new_path)
-            except Exception as e:
-                QMessageBox.critical(None, "Ошибка", f"Не удалось переименовать папку mods: {e}")
-                return
-            break
-        index += 1
+from endlinkerio_core import (
+    MINECRAFT_PATH, CACHE_PATH, HASH_INDEX_PATH, MIRROR_SERVE, PREFETCH_ENABLED,
+    resource_path, get_github_token, fetch_modpack_list, load_modpack_list_cache, format_modpack_info,
+    HashIndex, BackupStore, format_snapshot, load_installed_state, save_installed_state, pack_game_path,
+    Installer, InstallError, check_modpack_name, Prefetcher, format_progress,
+)
 
-def delete_mods_folder(minecraft_path):
-    mods_path = os.path.join(minecraft_path, "mods")
-    if os.path.exists(mods_path):
-        try:
-            shutil.rmtree(mods_path)
-        except Exception as e:
-            QMessageBox.critical(None, "Ошибка", f"Не удалось удалить папку mods: {e}")
+# Время запуска (импорты и первая отрисовка окна) дописывается сюда, последние записи
+STARTUP_LOG_PATH = os.path.join(CACHE_PATH, "startup.log")
+STARTUP_LOG_LINES = 200
+# Панель лога обновляется пачками по таймеру и хранит только последние строки;
+# полный лог установки пишется в файл с ротацией
+LOG_PANEL_MAX_LINES = 1000
+LOG_FLUSH_INTERVAL = 100  # мс
+LOG_FILE_PATH = os.path.join(CACHE_PATH, "endlinkerio.log")
+LOG_FILE_MAX_SIZE = 1024 * 1024
+LOG_FILE_BACKUPS = 3
 
 class InstallerWorker(QObject):
     progress = Signal(int)
+    status = Signal(str)
     finished = Signal(str)
     error = Signal(str)
-    server_added = Signal(str, str)
+    servers_added = Signal(list)  # [(name, ip), ...]
     log = Signal(str)
     clear_log = Signal()
 
@@ -101,252 +46,130 @@ class InstallerWorker(QObject):
         self.modpack_name = modpack_name
         self.rename_mode = rename_mode
 
+    def on_progress_update(self, snapshot):
+        self.progress.emit(snapshot["percent"])
+        self.status.emit(format_progress(snapshot))
+
     def run(self):
+        # Сама установка в endlinkerio_core, здесь только пересылка в сигналы
         self.clear_log.emit()
         try:
-            self.progress.emit(0)
-            self.log.emit("Переименование/удаление папки mods, если необходимо...")
-            
-            if self.rename_mode:
-                rename_mods_folder(MINECRAFT_PATH)
-                self.log.emit("Папка mods переименована")
-            else:
-                delete_mods_folder(MINECRAFT_PATH)
-                self.log.emit("Папка mods удалена")
-            
-            self.progress.emit(5)
-            # Запрос архива
-            self.log.emit("Запрос архива модпаков...")
-            resp = requests.get(ZIP_URL, headers=HEADERS)
-            resp.raise_for_status()
-            self.progress.emit(15)
-
-            with zipfile.ZipFile(io.BytesIO(resp.content)) as z:
-                root_folder = None
-                for name in z.namelist():
-                    if name.endswith('/') and '/' not in name[:-1]:
-                        root_folder = name
-                        break
-
-                if root_folder is None:
-                    self.error.emit("Не удалось определить корневую папку архива.")
-                    return
-
-                target_prefix = f"{root_folder}modpacks/{self.modpack_name}/"
-
-                found = False
-                existing_worlds = set()
-                file_list = [m for m in z.namelist() if m.startswith(target_prefix)]
-                total_files = len(file_list)
-                processed_files = 0
-
-                # --------------------------------------
-                # 1. Сначала собираем список всех имён миров из архива (папок в saves/)
-                archive_saves_worlds = set()
-                for member in file_list:
-                    relative_path = member[len(target_prefix):]
-                    if relative_path.startswith("saves/"):
-                        parts = relative_path.split("/")
-                        if len(parts) > 1:
-                            archive_saves_worlds.add(parts[1])
-
-                def format_worlds_list(worlds_set):
-                    worlds = [w.strip() for w in worlds_set if w.strip()]
-                    return ", ".join(worlds) if worlds else "нет"
-                
-                def log_worlds_action(log_func, worlds_set, action_singular, action_plural):
-                    worlds = [w.strip() for w in worlds_set if w.strip()]
-                    if not worlds:
-                        return 
-
-                    if len(worlds) == 1:
-                        log_func(f"Мир {worlds[0]} {action_singular}")
-                    else:
-                        log_func(f"Миры {', '.join(worlds)} {action_plural}")
-
-                self.log.emit(f"Текущие миры модпака: {format_worlds_list(archive_saves_worlds)}")
-
-                # 2. Проверяем, какие миры уже есть локально и добавляем их в existing_worlds
-                existing_worlds = set()
-                for world_name in archive_saves_worlds:
-                    local_save_path = os.path.join(MINECRAFT_PATH, "saves", world_name)
-                    if os.path.exists(local_save_path):
-                        existing_worlds.add(world_name)
-                
-                if existing_worlds:
-                    log_worlds_action(self.log.emit, existing_worlds, "пропущен", "пропущены")
-
-                worlds_to_download = archive_saves_worlds - existing_worlds
-                if worlds_to_download:
-                    log_worlds_action(self.log.emit, worlds_to_download, "добавлен", "добавлены")
-
-                # --------------------------------------
-
-                for member in file_list:
-                    found = True
-                    relative_path = member[len(target_prefix):]
-                    if not relative_path:
-                        continue
-
-                    # Если файл/папка внутри saves/<имя_мира>, который уже есть локально — пропускаем
-                    if relative_path.startswith("saves/"):
-                        parts = relative_path.split("/")
-                        if len(parts) > 1:
-                            save_world_name = parts[1]
-                            if save_world_name in existing_worlds:
-                                continue  # Пропускаем этот файл — мир уже есть локально
-
-                    target_path = os.path.join(MINECRAFT_PATH, relative_path)
-
-                    if member.endswith('/'):
-                        os.makedirs(target_path, exist_ok=True)
-                    else:
-                        os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                        with z.open(member) as source, open(target_path, "wb") as target:
-                            target.write(source.read())
-
-                    processed_files += 1
-                    if total_files > 0:
-                        progress_val = 15 + int((processed_files / total_files) * 55)
-                        self.progress.emit(progress_val)
-
-                if existing_worlds:
-                    filtered_worlds = [w.strip() for w in existing_worlds if w.strip()]
-                    if filtered_worlds:
-                        print(f"Текущие существующие миры из сборки: {', '.join(filtered_worlds)}")
-                        self.log.emit("Текущие существующие миры из сборки: " + ", ".join(filtered_worlds))
-
-                if not found:
-                    self.error.emit(f"Модпак '{self.modpack_name}' не найден в архиве.")
-                    return
-
-            self.progress.emit(75)
-            versions_path = os.path.join(MINECRAFT_PATH, "versions")
-            installer_jar_name = None
-
-            # Ищем jar с "-installer.jar" в названии (в версии)
-            jar_files = glob.glob(os.path.join(versions_path, "*.jar"))
-            for jar_path in jar_files:
-                if jar_path.endswith("-installer.jar"):
-                    installer_jar_name = os.path.basename(jar_path)
-                    break
-
-            if installer_jar_name:
-                # Получаем базовое имя версии (без "-installer.jar")
-                version_folder_name = installer_jar_name.replace("-installer.jar", "")
-                version_folder_path = os.path.join(versions_path, version_folder_name)
-
-                if os.path.isdir(version_folder_path):
-                    # Папка с версией уже есть — запуска не делаем, просто удаляем инсталлятор
-                    print(f"Папка версии '{version_folder_name}' найдена, запуска инсталлятора не будет.")
-                    self.log.emit(f"Папка версии '{version_folder_name}' найдена, запуска инсталлятора не будет.")
-                    try:
-                        os.remove(os.path.join(versions_path, installer_jar_name))
-                    except Exception as e:
-                        print(f"Ошибка удаления инсталлятора: {e}")
-                        self.log.emit(f"Ошибка удаления инсталлятора: {e}")
-                else:
-                    # Папки нет — запускаем инсталлятор
-                    jar_path = os.path.join(versions_path, installer_jar_name)
-                    try:
-                        subprocess.run(["java", "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-                        self.log.emit(f"Запуск инсталлятора модовой версии '{installer_jar_name}'...")
-                        with open(os.devnull, 'w') as devnull:
-                            subprocess.run(
-                                ["java", "-jar", jar_path],
-                                stdout=devnull,
-                                stderr=devnull,
-                                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
-                            )
-                        # После запуска удаляем инсталлятор
-                        os.remove(jar_path)
-                    except FileNotFoundError:
-                        self.error.emit("Java не установлена или недоступна в переменной среды.")
-                        return
-                    except Exception as e:
-                        print(f"Ошибка при запуске инсталлятора .jar: {e}")
-                        self.log.emit(f"Ошибка при запуске инсталлятора .jar: {e}")
-            else:
-                print("Инсталлятор не найден, запуск пропущен.")
-                self.log.emit("Инсталлятор не найден, запуск пропущен.")
-
-            self.progress.emit(90)
-            server_txt_path = os.path.join(MINECRAFT_PATH, "server.txt")
-            if os.path.exists(server_txt_path):
-                try:
-                    with open(server_txt_path, "r", encoding="utf-8") as f:
-                        lines = f.read().splitlines()
-                    name = ""
-                    ip = ""
-                    for line in lines:
-                        if line.startswith("name="):
-                            name = line.split("=", 1)[1].strip().strip('"')
-                        elif line.startswith("ip="):
-                            ip = line.split("=", 1)[1].strip().strip('"')
-                    if name and ip:
-                        # Вместо прямого вызова add_server_to_list с QMessageBox,
-                        # вызываем функцию, которая просто добавляет сервер без UI
-                        added = self.add_server_without_message(name, ip)
-                        # И эмитим сигнал в главный поток, чтобы там показать сообщение
-                        if added:
-                            self.server_added.emit(name, ip)
-                    else:
-                        print("Неверный формат в server.txt")
-                        self.log.emit("Неверный формат в server.txt")
-                except Exception as e:
-                    print(f"Ошибка обработки server.txt: {e}")
-                    self.log.emit(f"Ошибка обработки server.txt: {e}")
-                finally:
-                    os.remove(server_txt_path)
-
-            self.progress.emit(100)
-            self.finished.emit(f"Модпак '{self.modpack_name}' установлен в .minecraft.")
-            self.log.emit(f"Модпак '{self.modpack_name}' установлен в .minecraft.")
+            installer = Installer(
+                self.modpack_name, self.rename_mode,
+                log=self.log.emit,
+                on_progress=self.on_progress_update,
+                on_servers_added=self.servers_added.emit,
+            )
+            message = installer.install()
+        except Exception as e:
+            self.error.emit(str(e))
+            return
+        self.finished.emit(message)
+
+class RestoreWorker(QObject):
+    # Список резервных копий (snapshot=None) или восстановление mods из копии: хеширование
+    # и ссылки по всей папке mods идут вне потока интерфейса
+    listed = Signal(object)
+    finished = Signal(object)
+    error = Signal(str)
+
+    def __init__(self, game_path, snapshot=None):
+        super().__init__()
+        self.game_path = game_path
+        self.snapshot = snapshot
 
+    def run(self):
+        store = BackupStore(self.game_path)
+        try:
+            if self.snapshot is None:
+                self.listed.emit(store.list_snapshots())
+                return
+            hash_index = HashIndex(HASH_INDEX_PATH)
+            mods_path = os.path.join(self.game_path, "mods")
+            # Текущее состояние тоже сохраняем, чтобы откат можно было отменить
+            store.create_snapshot(mods_path, load_installed_state().get("pack"), hash_index)
+            restored, unchanged, removed = store.restore_snapshot(self.snapshot, mods_path, hash_index)
+            store.apply_retention()
+            hash_index.save()
+            if self.snapshot.get("pack"):
+                save_installed_state(self.snapshot["pack"])
+        except Exception as e:
+            # Любая ошибка (и битый снимок) должна дойти до окна, иначе поток восстановления не освободится
+            self.error.emit(f"Не удалось восстановить резервную копию: {e}")
+            return
+        self.finished.emit((self.snapshot, restored, unchanged, removed))
+
+class ModpackListWorker(QObject):
+    finished = Signal(object, bool)
+    error = Signal(str)
+
+    def __init__(self, cached_listing):
+        super().__init__()
+        self.cached_listing = cached_listing
+
+    def run(self):
+        try:
+            listing, changed = fetch_modpack_list(self.cached_listing)
+            self.finished.emit(listing, changed)
         except Exception as e:
             self.error.emit(str(e))
 
-    def add_server_without_message(self, name, ip):
-        MINECRAFT_DIR = os.path.join(os.getenv("APPDATA"), ".minecraft")
-        SERVERS_PATH = os.path.join(MINECRAFT_DIR, "servers.dat")
+_font_family = None
 
-        if not os.path.exists(SERVERS_PATH):
-            servers_data = nbtlib.File({
-                "servers": tag.List[nbtlib.Compound]()
-            })
-            root = servers_data.root
+def app_font_family():
+    # Шрифт регистрируется один раз на всё приложение
+    global _font_family
+    if _font_family is None:
+        font_id = QFontDatabase.addApplicationFont(resource_path("fonts/Genshin_Impact.ttf"))
+        if font_id == -1:
+            QMessageBox.warning(None, "Внимание", "Не удалось загрузить шрифт!")
+            _font_family = "Arial"
         else:
-            try:
-                servers_data = nbtlib.load(SERVERS_PATH)
-                root = getattr(servers_data, "root", servers_data)
-            except Exception as e:
-                print(f"Ошибка чтения servers.dat: {e}")
-                self.log.emit(f"Ошибка чтения servers.dat: {e}")
-                return False
-
-        servers = root.get("servers", tag.List())
-
-        for server in servers:
-            if server.get("ip") == ip:
-                print("Сервер уже существует в списке.")
-                self.log.emit(f"Сервер уже существует в списке.")
-                return False
-
-        new_server = nbtlib.Compound({
-            "acceptTextures": tag.Byte(1),
-            "hidden": tag.Byte(0),
-            "ip": tag.String(ip),
-            "name": tag.String(name)
-        })
-        servers.append(new_server)
-        root["servers"] = servers
+            _font_family = QFontDatabase.applicationFontFamilies(font_id)[0]
+            print(_font_family)
+    return _font_family
+
+_file_logger = None
 
+def get_file_logger():
+    global _file_logger
+    if _file_logger is None:
+        import logging
+        from logging.handlers import RotatingFileHandler
+
+        logger = logging.getLogger("endlinkerio")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
+            os.makedirs(os.path.dirname(LOG_FILE_PATH), exist_ok=True)
+            handler = RotatingFileHandler(LOG_FILE_PATH, maxBytes=LOG_FILE_MAX_SIZE,
+                                          backupCount=LOG_FILE_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+        except OSError as e:
+            print(f"Не удалось открыть файл лога: {e}")
+        _file_logger = logger
+    return _file_logger
+
+def record_startup_time(stages):
+    # stages: [(название этапа, секунды от старта модуля)]; лог помогает ловить регрессии в собранном exe
+    build = "frozen" if getattr(sys, "frozen", False) else "source"
+    line = time.strftime("%Y-%m-%d %H:%M:%S") + f" {build} " + " ".join(
+        f"{name}={seconds * 1000:.0f}ms" for name, seconds in stages
+    )
+    print(f"Время запуска: {line}")
+    try:
+        os.makedirs(os.path.dirname(STARTUP_LOG_PATH), exist_ok=True)
         try:
-            servers_data.save(SERVERS_PATH)
-        except AttributeError:
-            with open(SERVERS_PATH, "wb") as f:
-                f.write(nbtlib.serialize(servers_data))
-        return True
+            with open(STARTUP_LOG_PATH, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()[-(STARTUP_LOG_LINES - 1):]
+        except OSError:
+            lines = []
+        lines.append(line)
+        with open(STARTUP_LOG_PATH, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    except OSError as e:
+        print(f"Не удалось записать время запуска: {e}")
 
 class ModpackInstaller(QWidget):
     def __init__(self):
@@ -355,13 +178,7 @@ class ModpackInstaller(QWidget):
         self.setFixedSize(600, 350)
         self.setStyleSheet("background-color: #121212; color: white;")
 
-        font_id = QFontDatabase.addApplicationFont(resource_path("fonts/Genshin_Impact.ttf"))
-        if font_id == -1:
-            QMessageBox.warning(None, "Внимание", "Не удалось загрузить шрифт!")
-            self.font_family = "Arial"
-        else:
-            self.font_family = QFontDatabase.applicationFontFamilies(font_id)[0]
-            print(self.font_family)
+        self.font_family = app_font_family()
 
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(15, 15, 15, 15)
@@ -379,6 +196,23 @@ class ModpackInstaller(QWidget):
 
         title_container.addSpacerItem(QSpacerItem(40, 20, QSizePolicy.Minimum, QSizePolicy.Expanding))
 
+        # Откат mods к одной из резервных копий r-режима
+        self.restore_button = QPushButton("↺")
+        self.restore_button.setFixedSize(24, 24)
+        self.restore_button.setToolTip("Восстановить mods из резервной копии")
+        self.restore_button.setStyleSheet("""
+            QPushButton {
+                background-color: #3c3c3c;
+                color: white;
+                border-radius: 8px;
+            }
+            QPushButton:hover {
+                background-color: #505050;
+            }
+        """)
+        self.restore_button.clicked.connect(self.show_restore_dialog)
+        title_container.addWidget(self.restore_button, alignment=Qt.AlignRight | Qt.AlignVCenter)
+
         self.mode_switch = ModeSwitch()
         self.mode_switch.mode_changed.connect(self.on_mode_changed)
         title_container.addWidget(self.mode_switch, alignment=Qt.AlignRight | Qt.AlignVCenter)
@@ -391,57 +225,23 @@ class ModpackInstaller(QWidget):
 
         self.container = QFrame()
         self.container.setStyleSheet("background-color: #1e1e1e; border-radius: 4px;")
-        container_layout = QVBoxLayout(self.container)
-        container_layout.setContentsMargins(10, 10, 10, 10)
+        self.container_layout = QVBoxLayout(self.container)
+        self.container_layout.setContentsMargins(10, 10, 10, 10)
         main_layout.addWidget(self.container, stretch=1)
 
-        self.modpacks = fetch_modpack_list()
-        if not self.modpacks:
-            empty_label = QLabel("Нет доступных модпаков")
-            empty_label.setFont(QFont(self.font_family, 4))
-            empty_label.setStyleSheet("color: white;")
-            empty_label.setAlignment(Qt.AlignCenter)
-            container_layout.addWidget(empty_label)
-        else:
-            columns = 3
-            rows = ceil(len(self.modpacks) / columns)
-
-            for i in range(rows):
-                row_frame = QFrame()
-                row_layout = QHBoxLayout(row_frame)
-                row_layout.setContentsMargins(0, 5, 0, 5)
-                row_layout.setSpacing(20)
-                row_layout.setAlignment(Qt.AlignTop)
-
-                row_layout.addSpacerItem(QSpacerItem(20, 0, QSizePolicy.Expanding, QSizePolicy.Minimum))
-
-                remaining = len(self.modpacks) - i * columns
-                count_in_row = min(columns, remaining)
-
-                for j in range(count_in_row):
-                    idx = i * columns + j
-                    name = self.modpacks[idx]
-
-                    btn = QPushButton(name)
-                    btn.setFixedWidth(170)
-                    btn.setFont(QFont(self.font_family, 8))
-                    btn.setStyleSheet("""
-                        QPushButton {
-                            background-color: #ff9900;
-                            color: #1e1e1e;
-                            border-radius: 4px;
-                            padding: 6px;
-                        }
-                        QPushButton:hover {
-                            background-color: #e68a00;
-                        }
-                    """)
-                    btn.clicked.connect(lambda checked, n=name: self.start_install(n))
-                    row_layout.addWidget(btn)
-
-                row_layout.addSpacerItem(QSpacerItem(20, 0, QSizePolicy.Expanding, QSizePolicy.Minimum))
+        # Фоновая загрузка пишет только в файл лога: панель лога принадлежит установке
+        self.prefetcher = Prefetcher(log=get_file_logger().info) if PREFETCH_ENABLED else None
 
-                container_layout.addWidget(row_frame)
+        # Сохранённый список (или заглушку) показываем сразу, а с GitHub сверяемся в фоне
+        self.modpack_listing = load_modpack_list_cache()
+        self.build_modpack_grid()
+        self.list_thread = None
+        self.list_worker = None
+        self.restore_thread = None
+        self.restore_worker = None
+        self.restore_game_path = None
+        self.listed_snapshots = None
+        QTimer.singleShot(0, self.refresh_modpack_list)
 
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -462,12 +262,26 @@ class ModpackInstaller(QWidget):
         """)
         main_layout.addWidget(self.progress_bar)
 
+        # Фаза, объём, скорость и оставшееся время текущей установки
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #b0b0b0; font-size: 8pt;")
+        self.status_label.setVisible(False)
+        main_layout.addWidget(self.status_label)
+
         self.log_panel = QPlainTextEdit()
         self.log_panel.setReadOnly(True)
         # self.log_panel.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
         self.log_panel.setFixedHeight(78.3)  # примерно на 3 строки
+        self.log_panel.setMaximumBlockCount(LOG_PANEL_MAX_LINES)
         self.log_panel.setVisible(False)
 
+        # Сообщения копятся здесь и выводятся одной вставкой раз в LOG_FLUSH_INTERVAL
+        self.pending_log_lines = deque(maxlen=LOG_PANEL_MAX_LINES)
+        self.log_flush_timer = QTimer(self)
+        self.log_flush_timer.setSingleShot(True)
+        self.log_flush_timer.setInterval(LOG_FLUSH_INTERVAL)
+        self.log_flush_timer.timeout.connect(self.flush_log)
+
         self.log_panel.setStyleSheet("""
             QPlainTextEdit {
                 background-color: #2a2a2a;  /* чуть светлее чем контейнер */
@@ -521,10 +335,128 @@ class ModpackInstaller(QWidget):
         self.thread = None
         self.worker = None
 
+    def refresh_modpack_list(self):
+        if self.list_thread is not None:
+            return
+
+        self.list_thread = QThread()
+        self.list_worker = ModpackListWorker(self.modpack_listing)
+        self.list_worker.moveToThread(self.list_thread)
+
+        self.list_thread.started.connect(self.list_worker.run)
+        self.list_worker.finished.connect(self.on_modpack_list_loaded)
+        self.list_worker.error.connect(self.on_modpack_list_error)
+
+        self.list_worker.finished.connect(self.list_thread.quit)
+        self.list_worker.error.connect(self.list_thread.quit)
+        self.list_thread.finished.connect(self.cleanup_list_thread)
+
+        self.list_worker.finished.connect(self.list_worker.deleteLater)
+        self.list_worker.error.connect(self.list_worker.deleteLater)
+        self.list_thread.finished.connect(self.list_thread.deleteLater)
+
+        self.list_thread.start()
+
+    def on_modpack_list_loaded(self, listing, changed):
+        if changed or self.modpack_listing is None:
+            self.modpack_listing = listing
+            self.build_modpack_grid()
+        if self.prefetcher:
+            if changed:
+                self.prefetcher.request("список модпаков изменился", force=True)
+            elif load_installed_state().get("pack") in self.modpacks:
+                self.prefetcher.request("последний установленный модпак")
+
+    def eventFilter(self, obj, event):
+        # Наведение на кнопку модпака — вероятный клик, архив можно начать качать заранее
+        if event.type() == QEvent.Enter and self.prefetcher and obj.property("modpack"):
+            self.prefetcher.request(f"наведение на {obj.property('modpack')}")
+        return super().eventFilter(obj, event)
+
+    def on_modpack_list_error(self, error_message):
+        if self.modpack_listing is None:
+            QMessageBox.warning(None, "Ошибка", f"Не удалось получить список модпаков:\n{error_message}")
+            self.modpack_listing = {"packs": []}
+            self.build_modpack_grid()
+        else:
+            print(f"Не удалось обновить список модпаков, показан сохранённый: {error_message}")
+
+    def cleanup_list_thread(self):
+        self.list_thread = None
+        self.list_worker = None
+
+    def build_modpack_grid(self):
+        while self.container_layout.count():
+            item = self.container_layout.takeAt(0)
+            if item.widget() is not None:
+                item.widget().deleteLater()
+
+        packs = (self.modpack_listing or {}).get("packs", [])
+        self.modpacks = [pack["name"] for pack in packs]
+        if not self.modpacks:
+            # Пока список грузится впервые, вместо сетки показывается заглушка
+            if self.modpack_listing is None:
+                empty_label = QLabel("Загрузка списка модпаков...")
+            else:
+                empty_label = QLabel("Нет доступных модпаков")
+            empty_label.setFont(QFont(self.font_family, 4))
+            empty_label.setStyleSheet("color: white;")
+            empty_label.setAlignment(Qt.AlignCenter)
+            self.container_layout.addWidget(empty_label)
+        else:
+            columns = 3
+            rows = ceil(len(self.modpacks) / columns)
+
+            for i in range(rows):
+                row_frame = QFrame()
+                row_layout = QHBoxLayout(row_frame)
+                row_layout.setContentsMargins(0, 5, 0, 5)
+                row_layout.setSpacing(20)
+                row_layout.setAlignment(Qt.AlignTop)
+
+                row_layout.addSpacerItem(QSpacerItem(20, 0, QSizePolicy.Expanding, QSizePolicy.Minimum))
+
+                remaining = len(self.modpacks) - i * columns
+                count_in_row = min(columns, remaining)
+
+                for j in range(count_in_row):
+                    idx = i * columns + j
+                    name = self.modpacks[idx]
+
+                    btn = QPushButton(name)
+                    btn.setFixedWidth(170)
+                    btn.setFont(QFont(self.font_family, 8))
+                    btn.setToolTip(format_modpack_info(packs[idx]))
+                    btn.setStyleSheet("""
+                        QPushButton {
+                            background-color: #ff9900;
+                            color: #1e1e1e;
+                            border-radius: 4px;
+                            padding: 6px;
+                        }
+                        QPushButton:hover {
+                            background-color: #e68a00;
+                        }
+                    """)
+                    btn.clicked.connect(lambda checked, n=name: self.start_install(n))
+                    btn.setProperty("modpack", name)
+                    btn.installEventFilter(self)
+                    row_layout.addWidget(btn)
+
+                row_layout.addSpacerItem(QSpacerItem(20, 0, QSizePolicy.Expanding, QSizePolicy.Minimum))
+
+                self.container_layout.addWidget(row_frame)
+
     def start_install(self, modpack_name):
-        # 🔒 Проверка имени модпака на запрещённые символы
-        if re.search(r'[\/:*?"<>|]', modpack_name):
-            QMessageBox.critical(None, "Ошибка", f"Имя модпака '{modpack_name}' содержит недопустимые символы.")
+        # 🔒 Проверка имени модпака на запрещённые символы (та же, что в Installer)
+        try:
+            check_modpack_name(modpack_name)
+        except InstallError as e:
+            QMessageBox.critical(None, "Ошибка", str(e))
+            return
+
+        if self.restore_thread is not None:
+            QMessageBox.warning(None, "Внимание", "Дождитесь восстановления резервной копии")
             return
 
         # ✅ Проверка потока, как и было
@@ -536,19 +468,24 @@ class ModpackInstaller(QWidget):
             self.worker = None
 
         self.progress_bar.setVisible(True)
+        self.status_label.setText("")
+        self.status_label.setVisible(True)
         self.progress_bar.setValue(0)
 
         self.thread = QThread()
         self.worker = InstallerWorker(modpack_name, self.mode_switch.active_mode == "r")
-        self.worker.clear_log.connect(self.log_panel.clear)
+        self.worker.clear_log.connect(self.clear_log)
         self.worker.moveToThread(self.thread)
 
         self.thread.started.connect(self.worker.run)
         self.worker.progress.connect(self.progress_bar.setValue)
+        self.worker.status.connect(self.status_label.setText)
         self.worker.log.connect(self.append_log)
+        # В файл пишем прямо из потока установки, не нагружая интерфейс
+        self.worker.log.connect(get_file_logger().info, Qt.DirectConnection)
         self.worker.finished.connect(self.on_install_finished)
         self.worker.error.connect(self.on_install_error)
-        self.worker.server_added.connect(self.on_server_added)
+        self.worker.servers_added.connect(self.on_servers_added)
 
         self.worker.finished.connect(self.thread.quit)
         self.worker.error.connect(self.thread.quit)
@@ -558,37 +495,122 @@ class ModpackInstaller(QWidget):
         self.worker.error.connect(self.worker.deleteLater)
         self.thread.finished.connect(self.thread.deleteLater)
 
+        # Фоновая загрузка не делит канал с установкой; продолжится в cleanup_thread
+        if self.prefetcher:
+            self.prefetcher.pause()
         self.thread.start()
     
+    def show_restore_dialog(self):
+        if self.thread is not None and self.thread.isRunning():
+            QMessageBox.warning(None, "Внимание", "Дождитесь окончания установки")
+            return
+        if self.restore_thread is not None:
+            return  # список копий или восстановление уже идут
+
+        # В режиме профилей у каждого модпака свои mods и свои копии
+        installed_pack = load_installed_state().get("pack")
+        self.restore_game_path = pack_game_path(installed_pack) if installed_pack else MINECRAFT_PATH
+        self.start_restore_worker(RestoreWorker(self.restore_game_path))
+
+    def start_restore_worker(self, worker):
+        self.restore_thread = QThread()
+        self.restore_worker = worker
+        self.restore_worker.moveToThread(self.restore_thread)
+
+        self.restore_thread.started.connect(self.restore_worker.run)
+        self.restore_worker.listed.connect(self.on_snapshots_listed)
+        self.restore_worker.finished.connect(self.on_restore_finished)
+        self.restore_worker.error.connect(self.on_restore_error)
+
+        for signal in (self.restore_worker.listed, self.restore_worker.finished, self.restore_worker.error):
+            signal.connect(self.restore_thread.quit)
+            signal.connect(self.restore_worker.deleteLater)
+        self.restore_thread.finished.connect(self.cleanup_restore_thread)
+        self.restore_thread.finished.connect(self.restore_thread.deleteLater)
+
+        self.restore_thread.start()
+
+    def on_snapshots_listed(self, snapshots):
+        # Диалог выбора — когда поток списка завершится (cleanup_restore_thread), чтобы запустить следующий
+        self.listed_snapshots = snapshots
+
+    def cleanup_restore_thread(self):
+        self.restore_thread = None
+        self.restore_worker = None
+        snapshots, self.listed_snapshots = self.listed_snapshots, None
+        if snapshots is not None:
+            self.choose_snapshot(snapshots)
+
+    def choose_snapshot(self, snapshots):
+        if not snapshots:
+            QMessageBox.information(None, "Резервные копии", "Резервных копий пока нет. Они создаются при установке в r-режиме.")
+            return
+
+        labels = [format_snapshot(snapshot) for snapshot in snapshots]
+        label, ok = QInputDialog.getItem(self, "Резервные копии", "Восстановить папку mods из копии:", labels, 0, False)
+        if not ok:
+            return
+        if self.thread is not None and self.thread.isRunning():
+            QMessageBox.warning(None, "Внимание", "Дождитесь окончания установки")
+            return
+        self.start_restore_worker(RestoreWorker(self.restore_game_path, snapshots[labels.index(label)]))
+
+    def on_restore_finished(self, result):
+        snapshot, restored, unchanged, removed = result
+        self.append_log(f"Восстановлена резервная копия {snapshot['id']}: "
+                        f"файлов записано {restored}, без изменений {unchanged}, удалено {removed}")
+        QMessageBox.information(None, "Успех", f"Папка mods восстановлена из копии от {format_snapshot(snapshot)}.")
+
+    def on_restore_error(self, error_message):
+        QMessageBox.critical(None, "Ошибка", error_message)
+
     def on_mode_changed(self, mode):
         self.rename_mode = (mode == "r")
 
     def append_log(self, message):
+        self.pending_log_lines.append(message)
+        if not self.log_flush_timer.isActive():
+            self.log_flush_timer.start()
+
+    def flush_log(self):
+        if not self.pending_log_lines:
+            return
         self.log_panel.setVisible(True)
-        # Получаем текущие строки
-        existing = self.log_panel.toPlainText().splitlines()
-        existing.append(message)
-        # Обновляем текст
-        self.log_panel.setPlainText("\n".join(existing))
+        # Одна вставка на всю пачку вместо перестройки всего текста на каждую строку
+        self.log_panel.appendPlainText("\n".join(self.pending_log_lines))
+        self.pending_log_lines.clear()
         # Скроллим вниз к последнему сообщению
-        QTimer.singleShot(0, lambda: self.log_panel.verticalScrollBar().setValue(
-            self.log_panel.verticalScrollBar().maximum()
-        ))
-
-    def on_server_added(self, name, ip):
-        QMessageBox.information(None, "Успех", f"Сервер '{name}' по адресу '{ip}' добавлен в список серверов Minecraft.")
-        self.log.emit(f"Сервер '{name}' по адресу '{ip}' добавлен в список серверов Minecraft.")
+        scroll_bar = self.log_panel.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+
+    def clear_log(self):
+        self.pending_log_lines.clear()
+        self.log_panel.clear()
+
+    def on_servers_added(self, servers):
+        for name, ip in servers:
+            self.append_log(f"Сервер '{name}' по адресу '{ip}' добавлен в список серверов Minecraft.")
+        if len(servers) == 1:
+            name, ip = servers[0]
+            QMessageBox.information(None, "Успех", f"Сервер '{name}' по адресу '{ip}' добавлен в список серверов Minecraft.")
+        else:
+            server_lines = "\n".join(f"{name} — {ip}" for name, ip in servers)
+            QMessageBox.information(None, "Успех", f"В список серверов Minecraft добавлены:\n{server_lines}")
     
     def cleanup_thread(self):
         self.thread = None
         self.worker = None
+        if self.prefetcher:
+            self.prefetcher.resume()
 
     def on_install_finished(self, message):
         self.progress_bar.setVisible(False)
+        self.status_label.setVisible(False)
         QMessageBox.information(None, "Успех", message)
 
     def on_install_error(self, error_message):
         self.progress_bar.setVisible(False)
+        self.status_label.setVisible(False)
         QMessageBox.critical(None, "Ошибка установки", error_message)
 
 class ModeSwitch(QWidget):
@@ -606,8 +628,7 @@ class ModeSwitch(QWidget):
         # Метки "d" и "r" по краям
         self.label_d = QLabel("d", self)
         self.label_r = QLabel("r", self)
-        font_id = QFontDatabase.addApplicationFont(resource_path("fonts/Genshin_Impact.ttf"))
-        font_bold = QFontDatabase.applicationFontFamilies(font_id)[0]
+        font_bold = app_font_family()
 
         for label in (self.label_d, self.label_r):
             label.setAlignment(Qt.AlignCenter)
@@ -697,8 +718,26 @@ class ModeSwitch(QWidget):
         rect.adjust(1, 1, -1, -1)
         painter.drawRoundedRect(rect, 8, 8)
 
+IMPORTS_FINISHED = time.perf_counter()
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    try:
+        get_github_token()
+    except FileNotFoundError as e:
+        QMessageBox.critical(None, "Ошибка", str(e))
+        sys.exit(1)
     window = ModpackInstaller()
     window.show()
+    if MIRROR_SERVE:
+        from endlinkerio_mirror import MirrorServer
+        try:
+            mirror = MirrorServer().start()
+        except OSError as e:
+            print(f"Не удалось запустить зеркало модпаков: {e}")
+    # Первый проход цикла событий — окно уже отрисовано
+    QTimer.singleShot(0, lambda: record_startup_time([
+        ("imports", IMPORTS_FINISHED - STARTUP_STARTED),
+        ("window", time.perf_counter() - STARTUP_STARTED),
+    ]))
     sys.exit(app.exec())
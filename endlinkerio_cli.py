@@ -0,0 +1,170 @@
+import sys
+import os
+import json
+import time
+import argparse
+import threading
+
+import endlinkerio_core as core
+import endlinkerio_mirror
+
+# Установка модпаков из командной строки, без PySide6. Каждое событие — одна строка JSON в stdout:
+#   python endlinkerio_cli.py list
+#   python endlinkerio_cli.py install "Example (ver. 1.21.3)" --mode r
+#   python endlinkerio_cli.py verify
+#   python endlinkerio_cli.py sync
+#   python endlinkerio_cli.py mirror
+#   python endlinkerio_cli.py manifest "modpacks/Example (ver. 1.21.3)"
+#   python endlinkerio_cli.py install "Example (ver. 1.21.3)" --trace trace.json --profile install.prof
+
+class EventWriter:
+    # Строки JSON пишутся из нескольких потоков установки — по одной целиком
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def __call__(self, event, **data):
+        line = json.dumps({"event": event, **data}, ensure_ascii=False)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+def installed_pack_name(args):
+    if args.pack:
+        return args.pack
+    pack = core.load_installed_state().get("pack")
+    if not pack:
+        raise core.InstallError("Модпак не указан, а установленных ещё не было.")
+    return pack
+
+def command_list(args, emit):
+    cached = core.load_modpack_list_cache()
+    try:
+        listing, _ = core.fetch_modpack_list(cached)
+    except Exception as e:
+        if not cached:
+            raise
+        emit("log", message=f"Список модпаков не обновлён ({e}), показан сохранённый")
+        listing = cached
+    installed = core.load_installed_state().get("pack")
+    for pack in listing["packs"]:
+        emit("pack", installed=pack["name"] == installed, **pack)
+    return 0
+
+def command_install(args, emit, modpack_name=None):
+    installer = core.Installer(
+        modpack_name or args.pack,
+        args.mode == "r",
+        log=lambda message: emit("log", message=message),
+        on_progress=lambda snapshot: emit("progress", **snapshot),
+        on_servers_added=lambda servers: emit("servers_added", servers=[list(server) for server in servers]),
+        trace_path=args.trace,
+        profile_path=args.profile,
+    )
+    message = installer.install()
+    emit("done", message=message)
+    return 0
+
+def command_sync(args, emit):
+    # Обновить до последней версии тот модпак, что уже установлен
+    return command_install(args, emit, installed_pack_name(args))
+
+def command_verify(args, emit):
+    installer = core.Installer(installed_pack_name(args), log=lambda message: emit("log", message=message))
+    report = installer.verify()
+    emit("report", **report)
+    return 0 if not (report["missing"] or report["changed"]) else 2
+
+def add_trace_arguments(parser):
+    parser.add_argument("--trace", help="куда сохранить трассу установки (Chrome trace JSON)")
+    parser.add_argument("--profile", help="сохранить профиль cProfile в этот файл")
+
+def command_mirror(args, emit):
+    # Раздача модпаков по сети до Ctrl+C
+    server = endlinkerio_mirror.MirrorServer(args.port, log=lambda message: emit("log", message=message)).start()
+    emit("mirror", port=server.port)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        server.stop()
+
+def command_manifest(args, emit):
+    # Для владельца репозитория: manifest.json в папке модпака, пересоздаётся перед каждым коммитом
+    if not os.path.isdir(args.path):
+        raise core.InstallError(f"Папка модпака {args.path} не найдена.")
+    if args.check:
+        manifest = core.build_manifest(args.path)
+        current = core.read_json_file(os.path.join(args.path, core.MANIFEST_NAME))
+        emit("manifest", path=args.path, files=len(manifest["files"]), fresh=current == manifest)
+        return 0 if current == manifest else 2
+    manifest = core.write_manifest(args.path)
+    emit("manifest", path=args.path, files=len(manifest["files"]), fresh=True)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="endlinkerio_cli", description="EndLinkerio без интерфейса")
+    parser.add_argument("--minecraft-path", help="папка .minecraft (по умолчанию как у окна)")
+    parser.add_argument("--fetch-mode", choices=("zipball", "tree"), help="как качать модпак")
+    parser.add_argument("--mirror", help="адрес LAN-зеркала, например http://192.168.1.10:8737")
+    parser.add_argument("--profiles", action="store_true", help="каждый модпак в своём профиле лаунчера")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="список модпаков")
+
+    install = commands.add_parser("install", help="установить модпак")
+    install.add_argument("pack")
+    install.add_argument("--mode", choices=("d", "r"), default="d", help="r — с резервной копией mods")
+    add_trace_arguments(install)
+
+    verify = commands.add_parser("verify", help="сверить файлы с модпаком (код 2 — есть расхождения)")
+    verify.add_argument("pack", nargs="?", help="по умолчанию установленный")
+
+    sync = commands.add_parser("sync", help="обновить установленный модпак")
+    sync.add_argument("pack", nargs="?", help="по умолчанию установленный")
+    sync.add_argument("--mode", choices=("d", "r"), default="d")
+    add_trace_arguments(sync)
+
+    mirror = commands.add_parser("mirror", help="раздавать архивы и файлы модпаков по локальной сети")
+    mirror.add_argument("--port", type=int, help=f"порт HTTP (по умолчанию {core.MIRROR_PORT})")
+
+    manifest = commands.add_parser("manifest", help="создать manifest.json в папке модпака")
+    manifest.add_argument("path", help="папка modpacks/<модпак> в репозитории")
+    manifest.add_argument("--check", action="store_true", help="только проверить (код 2 — манифест устарел)")
+    return parser
+
+COMMANDS = {
+    "list": command_list,
+    "install": command_install,
+    "verify": command_verify,
+    "sync": command_sync,
+    "mirror": command_mirror,
+    "manifest": command_manifest,
+}
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.minecraft_path:
+        core.MINECRAFT_PATH = os.path.abspath(args.minecraft_path)
+    if args.fetch_mode:
+        core.FETCH_MODE = args.fetch_mode
+    if args.mirror:
+        core.MIRROR_URL = args.mirror
+    if args.profiles:
+        core.PROFILE_MODE = True
+
+    # stdout только для JSON; обычные print из установки уходят в stderr
+    emit = EventWriter(sys.stdout)
+    sys.stdout = sys.stderr
+    try:
+        return COMMANDS[args.command](args, emit)
+    except Exception as e:
+        emit("error", message=str(e))
+        return 1
+    finally:
+        sys.stdout = emit.stream
+
+if __name__ == "__main__":
+    sys.exit(main())
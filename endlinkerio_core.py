@@ -0,0 +1,2951 @@
+import time
+import sys
+import os
+import re
+import zipfile
+import shutil
+import getpass
+import glob
+import subprocess
+import io
+import mmap
+import json
+import zlib
+import struct
+import hashlib
+import threading
+import fnmatch
+import contextlib
+import socket
+import random
+import base64
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import namedtuple, deque
+
+# Установка модпаков без Qt: используется окном (endlinkerio.py) и командной строкой (endlinkerio_cli.py)
+
+GITHUB_REPO = "USERNAME/PRIVATEREPO"
+BRANCH = "master"
+GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_REPO}/contents/modpacks"
+API_REPO_URL = f"https://api.github.com/repos/{GITHUB_REPO}"
+COMMIT_URL = f"{API_REPO_URL}/commits/{BRANCH}"
+
+# "zipball" — весь репозиторий одним архивом,
+# "tree" — только файлы выбранного модпака через Git trees API
+FETCH_MODE = "zipball"
+# Манифест модпака (modpacks/<Имя>/manifest.json, "endlinkerio_cli.py manifest <папка>"): файлы с размером,
+# SHA блоба и ролью. С ним в режиме "zipball" план строится до загрузки, а архив не качается,
+# если все файлы уже на месте. Устаревший манифест замечается по дереву модпака и не используется
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# Сколько файлов модпака качается одновременно в режиме "tree"
+DOWNLOAD_WORKERS = 8
+# Сколько файлов распаковывается из архива одновременно
+EXTRACT_WORKERS = min(4, os.cpu_count() or 1)
+# Файлы копируются кусками через один переиспользуемый буфер на поток
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Архив качается кусками в файл на диске, а не целиком в память
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Обрыв соединения не сбрасывает загрузку: недокачанный файл продолжается через Range
+DOWNLOAD_RETRIES = 5
+DOWNLOAD_TIMEOUT = (10, 60)
+# Если сервер отдаёт Range, архив качается кусками по DOWNLOAD_SEGMENT_SIZE сразу в DOWNLOAD_CONNECTIONS
+# соединений (одно TCP-соединение на дальнем канале не выбирает всю скорость). Меньше SEGMENTED_MIN_SIZE —
+# одно соединение; DOWNLOAD_CONNECTIONS = 1 отключает куски совсем
+DOWNLOAD_CONNECTIONS = 4
+DOWNLOAD_SEGMENT_SIZE = 16 * 1024 * 1024
+SEGMENTED_MIN_SIZE = 64 * 1024 * 1024
+
+# Токен один на всех друзей, поэтому его лимит запросов (X-RateLimit-*) бережём. Запросы к GitHub API
+# повторяются при 5xx, вторичном лимите и обрывах: задержка со случайным разбросом или по Retry-After.
+# GET-ответы с ETag сохраняются в API_CACHE_PATH и перезапрашиваются условно (ответ 304 лимит не тратит);
+# если лимит исчерпан или GitHub недоступен, отдаётся сохранённый ответ
+API_RETRIES = 4
+API_BACKOFF_BASE = 1.0
+API_BACKOFF_MAX = 30.0
+# Дольше сброса лимита не ждём: лучше сохранённые данные или понятная ошибка
+API_MAX_WAIT = 60
+API_CACHE_MAX_BODY = 8 * 1024 * 1024
+API_CACHE_KEEP_LAST = 500
+# В режиме "tree" каждый файл — отдельный запрос: если лимита не хватит на файлы и этот запас,
+# качается архив одним запросом; фоновая загрузка при таком остатке не запускается
+RATE_LIMIT_RESERVE = 50
+
+# LAN-зеркало (endlinkerio_mirror.py): один компьютер раздаёт архивы и файлы модпаков остальным.
+# Адрес задаётся в MIRROR_URL ("http://192.168.1.10:8737") или ищется широковещательным запросом по UDP.
+# Всё, что пришло с зеркала, сверяется с хешами из репозитория; при ошибке файлы берутся с GitHub
+MIRROR_URL = None
+# Поиск по UDP ждёт ответа до MIRROR_DISCOVERY_TIMEOUT на каждую установку без кэша — только по желанию
+MIRROR_DISCOVERY = False
+MIRROR_DISCOVERY_ADDRESS = "255.255.255.255"
+MIRROR_DISCOVERY_PORT = 8738
+MIRROR_DISCOVERY_TIMEOUT = 0.3
+# Раздавать самому: окно запускает зеркало при старте, без окна — "endlinkerio_cli.py mirror"
+MIRROR_SERVE = False
+MIRROR_PORT = 8737
+
+USERNAME = getpass.getuser()
+MINECRAFT_PATH = os.path.join("C:\\Users", USERNAME, "AppData", "Roaming", ".minecraft")
+
+# Кэш архивов по SHA коммита; старые архивы удаляются, когда кэш больше лимита
+CACHE_PATH = os.path.join(os.getenv("LOCALAPPDATA") or os.path.expanduser("~"), "EndLinkerio")
+ARCHIVE_CACHE_PATH = os.path.join(CACHE_PATH, "archives")
+ARCHIVE_CACHE_MAX_SIZE = 4 * 1024 * 1024 * 1024
+
+# Фоновая загрузка (окно): пока окно простаивает, архив текущего коммита заранее качается в кэш —
+# после изменения списка модпаков, для последнего установленного модпака и при наведении на кнопку.
+# Не быстрее PREFETCH_RATE_LIMIT байт/с, на время установки останавливается; только для FETCH_MODE = "zipball"
+PREFETCH_ENABLED = False
+PREFETCH_RATE_LIMIT = 1024 * 1024
+# Коммит ветки проверяется не чаще раза в PREFETCH_CHECK_INTERVAL секунд (кроме изменения списка)
+PREFETCH_CHECK_INTERVAL = 300
+PREFETCH_PATH = os.path.join(CACHE_PATH, "prefetch")
+
+# Записывать только новые/изменённые файлы, а в d-режиме удалять только лишние моды
+INCREMENTAL_SYNC = True
+HASH_INDEX_PATH = os.path.join(CACHE_PATH, "hashes.json")
+# Уже установленные миры из saves/ обновляются по файлам (в основном region/*.mca),
+# а не пропускаются целиком. Файлы игрока из WORLD_PROTECTED_FILES не перезаписываются
+WORLD_SYNC = True
+WORLD_PROTECTED_FILES = (
+    "level.dat", "level.dat_old", "session.lock",
+    "playerdata/*", "stats/*", "advancements/*",
+)
+# Последний полученный список модпаков с ETag — показывается сразу, даже без сети
+MODPACK_LIST_CACHE_PATH = os.path.join(CACHE_PATH, "modpacks.json")
+# Какой модпак установлен последним
+INSTALLED_STATE_PATH = os.path.join(CACHE_PATH, "installed.json")
+# Найденные java и версии, которые ставит каждый инсталлятор загрузчика (по SHA-256 jar и SHA блоба)
+JAVA_CACHE_PATH = os.path.join(CACHE_PATH, "java.json")
+# Сохранённые ответы GitHub API и последний известный остаток лимита
+API_CACHE_PATH = os.path.join(CACHE_PATH, "api")
+RATE_LIMIT_STATE_PATH = os.path.join(CACHE_PATH, "ratelimit.json")
+LOADER_CACHE_PATH = os.path.join(CACHE_PATH, "loaders.json")
+# Режим профилей: каждый модпак ставится в свою папку игры <.minecraft>/PROFILES_FOLDER_NAME/<модпак>
+# и прописывается в launcher_profiles.json профилем лаунчера с этим gameDir. Выбор установленного
+# модпака, который не менялся в репозитории, только переключает профиль, ничего не загружая и не копируя.
+# versions/ остаётся общей, одинаковые файлы из PROFILE_SHARED_FOLDERS разных модпаков — жёсткие ссылки
+PROFILE_MODE = False
+PROFILES_FOLDER_NAME = "endlinkerio-profiles"
+PROFILE_SHARED_FOLDERS = ("mods/", "resourcepacks/", "shaderpacks/")
+PROFILES_STATE_PATH = os.path.join(CACHE_PATH, "profiles.json")
+
+# r-режим: копии mods хранятся в .minecraft/mods-backups без дублей одинаковых jar
+BACKUP_FOLDER_NAME = "mods-backups"
+BACKUP_KEEP_LAST = 10
+BACKUP_MAX_SIZE = 2 * 1024 * 1024 * 1024
+# Прогресс отправляется в интерфейс не чаще раза в PROGRESS_INTERVAL секунд;
+# скорость считается по последним PROGRESS_RATE_WINDOW секундам
+PROGRESS_INTERVAL = 0.25
+PROGRESS_RATE_WINDOW = 3.0
+# Трасса каждой установки (фазы, файлы, счётчики) в формате Chrome trace — её можно открыть
+# в chrome://tracing или ui.perfetto.dev; хранятся последние TRACE_KEEP_LAST
+TRACE_ENABLED = True
+TRACE_PATH = os.path.join(CACHE_PATH, "traces")
+TRACE_KEEP_LAST = 10
+# cProfile установки рядом с трассой (.prof); замедляет установку, поэтому только по запросу
+PROFILE_ENABLED = os.getenv("ENDLINKERIO_PROFILE") == "1"
+
+
+class InstallError(Exception):
+    pass
+
+def resource_path(relative_path):
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+def read_github_token():
+    token_path = resource_path("penny.txt")
+    if not os.path.isfile(token_path):
+        raise FileNotFoundError(f"Файл с токеном {token_path} не найден!")
+    with open(token_path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+_github_token = None
+
+def get_github_token():
+    # Токен читается при первом обращении, а не при импорте модуля
+    global _github_token
+    if _github_token is None:
+        _github_token = read_github_token()
+    return _github_token
+
+class RateLimitError(InstallError):
+    pass
+
+class GitHubClient:
+    # Все запросы к GitHub API: общий пул соединений, учёт лимита токена, условные запросы
+    # по сохранённым ETag и повторы. Ответ из кэша выглядит как обычный ответ 200
+    RETRY_STATUSES = (500, 502, 503, 504)
+    CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+    def __init__(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(DOWNLOAD_WORKERS, 10))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"token {get_github_token()}",
+            "Accept": "application/vnd.github.v3+json"
+        })
+        self.lock = threading.Lock()
+        # Исчерпанный лимит переживает перезапуск: до сброса GitHub не дёргаем
+        self.rate_limit = read_json_file(RATE_LIMIT_STATE_PATH)
+        self.stored = 0
+        self.stale_warned = False
+
+    def remaining(self):
+        # Остаток лимита или None, если он неизвестен или уже сброшен
+        with self.lock:
+            if self.rate_limit.get("reset", 0) <= time.time():
+                return None
+            return self.rate_limit.get("remaining")
+
+    def blocked_for(self):
+        with self.lock:
+            if self.rate_limit.get("remaining") != 0:
+                return 0
+            return max(0.0, self.rate_limit.get("reset", 0) - time.time())
+
+    def get(self, url, params=None, headers=None, stream=False, timeout=DOWNLOAD_TIMEOUT):
+        import requests
+
+        headers = dict(headers or {})
+        cache_path = None
+        cached = None
+        # Свои условные заголовки и докачка идут как есть; потоковые ответы не кэшируются
+        if not stream and not {"If-None-Match", "If-Modified-Since", "Range"} & set(headers):
+            cache_path = self.cache_path(url, params, headers)
+            cached = read_json_file(cache_path) or None
+            if cached and cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            elif cached and cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        for attempt in range(API_RETRIES + 1):
+            wait = self.blocked_for()
+            if wait:
+                if cached:
+                    return self.from_cache(cached, cache_path, "лимит запросов исчерпан")
+                if wait > API_MAX_WAIT:
+                    raise RateLimitError(self.limit_message())
+                time.sleep(wait + 1)
+            try:
+                response = self.session.get(url, params=params, headers=headers, stream=stream, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == API_RETRIES:
+                    if cached:
+                        return self.from_cache(cached, cache_path, f"нет связи ({e.__class__.__name__})")
+                    raise
+                time.sleep(self.backoff(attempt))
+                continue
+            self.track(response)
+            delay, limited = self.retry_delay(response, attempt)
+            if delay is None:
+                break
+            if attempt == API_RETRIES or delay > API_MAX_WAIT:
+                if cached:
+                    response.close()
+                    return self.from_cache(cached, cache_path, f"ответ {response.status_code}")
+                if limited:
+                    response.close()
+                    raise RateLimitError(self.limit_message())
+                break  # ошибку разберёт вызывающий через raise_for_status
+            response.close()
+            time.sleep(delay)
+
+        if cached and response.status_code == 304:
+            return self.from_cache(cached, cache_path)
+        if cache_path and response.status_code == 200 \
+                and (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+            self.store(cache_path, url, response)
+        return response
+
+    def backoff(self, attempt):
+        # Половина задержки постоянная, половина случайная: у друзей повторы не совпадают
+        delay = min(API_BACKOFF_MAX, API_BACKOFF_BASE * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def retry_delay(self, response, attempt):
+        # (задержка перед повтором или None, если повторять не нужно; упёрлись ли в лимит)
+        status = response.status_code
+        if status not in (403, 429) and status not in self.RETRY_STATUSES:
+            return None, False
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                from email.utils import parsedate_to_datetime
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return max(0.0, delay), status in (403, 429)
+        if status in self.RETRY_STATUSES:
+            return self.backoff(attempt), False
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            return max(0.0, int(response.headers.get("X-RateLimit-Reset", 0)) - time.time()) + 1, True
+        # Вторичный лимит (слишком много запросов подряд) приходит как 403 без Retry-After
+        if status == 429 or "rate limit" in response.text.lower():
+            return self.backoff(attempt), True
+        return None, False  # обычный 403: нет доступа
+
+    def track(self, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        with self.lock:
+            was_exhausted = self.rate_limit.get("remaining") == 0
+            self.rate_limit = {
+                "limit": int(response.headers.get("X-RateLimit-Limit") or 0),
+                "remaining": int(remaining),
+                "reset": int(reset),
+            }
+            changed = (self.rate_limit["remaining"] == 0) != was_exhausted
+            state = dict(self.rate_limit)
+        if changed:
+            write_json_atomic(RATE_LIMIT_STATE_PATH, state)
+
+    def limit_message(self):
+        reset = self.rate_limit.get("reset", 0)
+        return f"Лимит запросов GitHub исчерпан, попробуйте после {time.strftime('%H:%M', time.localtime(reset))}"
+
+    def cache_path(self, url, params, headers):
+        from urllib.parse import urlencode
+        key = f"{url}?{urlencode(sorted((params or {}).items()))}|{headers.get('Accept', '')}"
+        return os.path.join(API_CACHE_PATH, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def from_cache(self, cached, cache_path, stale_reason=None):
+        import requests
+        from requests.structures import CaseInsensitiveDict
+
+        if stale_reason and not self.stale_warned:
+            self.stale_warned = True
+            print(f"GitHub: {stale_reason}, используются сохранённые ответы")
+        try:
+            os.utime(cache_path)  # для вытеснения старых ответов
+        except OSError:
+            pass
+        response = requests.Response()
+        response.status_code = 200
+        response._content = base64.b64decode(cached["body"])
+        response.headers = CaseInsensitiveDict(cached.get("headers") or {})
+        response.encoding = cached.get("encoding")
+        response.url = cached.get("url")
+        response.from_cache = True
+        return response
+
+    def store(self, cache_path, url, response):
+        content = response.content
+        if len(content) > API_CACHE_MAX_BODY:
+            return
+        try:
+            write_json_atomic(cache_path, {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "headers": {name: response.headers[name] for name in self.CACHED_HEADERS if name in response.headers},
+                "encoding": response.encoding,
+                "body": base64.b64encode(content).decode("ascii"),
+            })
+        except OSError:
+            return  # тот же ответ одновременно сохраняет другой поток
+        with self.lock:
+            self.stored += 1
+            prune = self.stored % 50 == 1
+        if prune:
+            self.prune_cache()
+
+    def prune_cache(self):
+        try:
+            names = [name for name in os.listdir(API_CACHE_PATH) if name.endswith(".json")]
+            paths = sorted((os.path.join(API_CACHE_PATH, name) for name in names), key=os.path.getmtime)
+            for path in paths[:-API_CACHE_KEEP_LAST]:
+                os.remove(path)
+        except OSError:
+            pass
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    # Один клиент на всё приложение: соединения с GitHub и учёт лимита общие для всех потоков
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = GitHubClient()
+    return _session
+
+def write_json_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def load_modpack_list_cache():
+    try:
+        with open(MODPACK_LIST_CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def build_modpack_listing(tree_items, previous):
+    # Размер и число файлов каждого модпака из одного рекурсивного листинга дерева
+    packs = {}
+    for item in tree_items:
+        parts = item["path"].split("/")
+        if parts[0] != "modpacks" or len(parts) < 2:
+            continue
+        if len(parts) == 2:
+            if item["type"] == "tree":
+                packs[parts[1]] = {"name": parts[1], "size": 0, "files": 0, "tree": item["sha"], "commit": None}
+        elif item["type"] == "blob" and parts[1] in packs:
+            packs[parts[1]]["size"] += item.get("size", 0)
+            packs[parts[1]]["files"] += 1
+
+    # Дерево модпака не изменилось — коммит остаётся прежним, иначе спрашиваем последний коммит,
+    # который менял папку модпака (запрос только для новых и изменённых модпаков)
+    previous_packs = {pack["name"]: pack for pack in (previous or {}).get("packs", [])}
+    for pack in packs.values():
+        old = previous_packs.get(pack["name"])
+        if old and old.get("tree") == pack["tree"]:
+            pack["commit"] = old.get("commit")
+        else:
+            try:
+                pack["commit"] = resolve_pack_commit(pack["name"])
+            except Exception:
+                pack["commit"] = None
+    return list(packs.values())
+
+def fetch_modpack_list(cached=None):
+    # Возвращает (список, изменился ли он); неизменный список стоит один ответ 304
+    headers = {}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    response = get_session().get(f"{API_REPO_URL}/git/trees/{BRANCH}", params={"recursive": "1"}, headers=headers)
+    if response.status_code == 304:
+        return cached, False
+    response.raise_for_status()
+    data = response.json()
+
+    if data.get("truncated"):
+        # Репозиторий слишком большой для рекурсивного листинга — только имена папок
+        contents = get_session().get(GITHUB_API_URL)
+        contents.raise_for_status()
+        packs = [{"name": item['name']} for item in contents.json() if item['type'] == 'dir']
+    else:
+        packs = build_modpack_listing(data["tree"], cached)
+
+    listing = {"etag": response.headers.get("ETag"), "packs": packs}
+    write_json_atomic(MODPACK_LIST_CACHE_PATH, listing)
+    return listing, True
+
+def format_modpack_info(pack):
+    lines = []
+    if pack.get("size") is not None:
+        lines.append(f"Размер: {pack['size'] / (1024 * 1024):.1f} МБ")
+    if pack.get("files") is not None:
+        lines.append(f"Файлов: {pack['files']}")
+    if pack.get("commit"):
+        lines.append(f"Коммит: {pack['commit'][:7]}")
+    return "\n".join(lines)
+
+def resolve_pack_commit(modpack_name):
+    response = get_session().get(f"{API_REPO_URL}/commits",
+                                 params={"sha": BRANCH, "path": f"modpacks/{modpack_name}", "per_page": "1"})
+    response.raise_for_status()
+    commits = response.json()
+    return commits[0]["sha"] if commits else None
+
+def resolve_commit_sha():
+    response = get_session().get(COMMIT_URL, headers={"Accept": "application/vnd.github.sha"})
+    response.raise_for_status()
+    return response.text.strip()
+
+def load_partial_download(part_path, meta_path):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return meta, os.path.getsize(part_path)
+    except (OSError, ValueError):
+        return {}, 0
+
+def discard_partial_download(part_path, meta_path):
+    for leftover in (part_path, meta_path):
+        try:
+            os.remove(leftover)
+        except OSError:
+            pass
+
+def download_part(url, part_path, meta_path, on_progress=None, log=None, session=None):
+    # Докачивает part_path с места обрыва; возвращает True, если файл собран из нескольких частей
+    meta, have = load_partial_download(part_path, meta_path)
+    headers = {}
+    # Файл от загрузки кусками заранее полного размера — его размер не значит, сколько скачано
+    if have and meta.get("url") == url and not meta.get("segments"):
+        headers["Range"] = f"bytes={have}-"
+        validator = meta.get("etag") or meta.get("last_modified")
+        if validator:
+            headers["If-Range"] = validator
+    else:
+        have = 0
+
+    with (session or get_session()).get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as resp:
+        if resp.status_code == 416 and have and have == meta.get("size"):
+            return True  # всё уже было скачано до обрыва
+        resp.raise_for_status()
+
+        start = 0
+        total = int(resp.headers.get("Content-Length") or 0)
+        if resp.status_code == 206:
+            match = re.match(r"bytes (\d+)-\d+/(\d+|\*)", resp.headers.get("Content-Range", ""))
+            start = int(match.group(1)) if match else 0
+            if match and match.group(2) != "*":
+                total = int(match.group(2))
+            else:
+                total = start + total if total else 0
+            if start > have:
+                start = 0  # сервер прислал не тот кусок, качаем заново
+        if start and log:
+            log(f"Продолжаем загрузку с {start // (1024 * 1024)} МБ")
+
+        meta = {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "size": total or None,
+        }
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        with open(part_path, "r+b" if start else "wb") as f:
+            f.seek(start)
+            f.truncate()
+            downloaded = start
+            for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                # Сразу на диск: архив читается параллельно, пока докачивается
+                f.flush()
+                downloaded += len(chunk)
+                if on_progress:
+                    on_progress(downloaded, total)
+    return start > 0
+
+def check_archive(path, expected_size, full):
+    size = os.path.getsize(path)
+    if expected_size and size != expected_size:
+        raise zipfile.BadZipFile(f"Размер архива {size} байт вместо {expected_size}")
+    with zipfile.ZipFile(path) as z:
+        # Склеенный из частей архив проверяем по CRC всех файлов
+        if full:
+            bad_member = z.testzip()
+            if bad_member:
+                raise zipfile.BadZipFile(f"Повреждён файл архива {bad_member}")
+
+class RangeNotSupported(Exception):
+    pass
+
+# Серверы, которые ответили на Range целым файлом: их больше не пробуем качать кусками
+_no_range_hosts = set()
+
+def download_segmented(url, part_path, meta_path, on_progress=None, log=None, session=None, on_available=None,
+                       retries=DOWNLOAD_RETRIES):
+    # Файл создаётся сразу полного размера, каждый кусок пишется со своего смещения своим соединением.
+    # Готовые куски запоминаются в meta_path: после обрыва качаются только остальные.
+    # on_available(n) — первые n байт уже на диске (для распаковки во время загрузки).
+    # RangeNotSupported — сервер не умеет Range, качать надо одним потоком (download_part)
+    import requests
+    from urllib.parse import urlparse
+
+    host = urlparse(url).netloc
+    if host in _no_range_hosts:
+        raise RangeNotSupported()
+    session = session or get_session()
+    meta, have = load_partial_download(part_path, meta_path)
+    # Пробный запрос — он же первый кусок; если начало файла уже скачано, хватает одного байта
+    # ради размера и ETag. Заодно видно, умеет ли сервер Range
+    head_done = meta.get("url") == url and (0 in meta.get("done", []) or meta.get("partial", {}).get("0")
+                                            or (not meta.get("segments") and have))
+    probe_end = 0 if head_done else DOWNLOAD_SEGMENT_SIZE - 1
+    probe = session.get(url, headers={"Range": f"bytes=0-{probe_end}"}, stream=True, timeout=DOWNLOAD_TIMEOUT)
+    match = re.match(r"bytes 0-(\d+)/(\d+)$", probe.headers.get("Content-Range", ""))
+    if probe.status_code != 206 or not match:
+        probe.close()
+        probe.raise_for_status()
+        _no_range_hosts.add(host)
+        raise RangeNotSupported()
+    total = int(match.group(2))
+    validator = probe.headers.get("ETag") or probe.headers.get("Last-Modified")
+    # Слабый ETag в If-Range не годится: сервер ответит целым файлом
+    if_range = probe.headers.get("Last-Modified") if (validator or "").startswith("W/") else validator
+    # Куски — по адресу после перенаправлений (zipball -> codeload), лимит API тратит только первый запрос
+    segment_url = probe.url
+
+    if total >= SEGMENTED_MIN_SIZE:
+        segment_count = -(-total // DOWNLOAD_SEGMENT_SIZE)
+        segments = [(i * DOWNLOAD_SEGMENT_SIZE, min(total, (i + 1) * DOWNLOAD_SEGMENT_SIZE) - 1)
+                    for i in range(segment_count)]
+    else:
+        # Небольшой файл — одним соединением: пробный кусок и остаток одним запросом
+        segments = [(0, min(total, DOWNLOAD_SEGMENT_SIZE) - 1)]
+        if total > DOWNLOAD_SEGMENT_SIZE:
+            segments.append((DOWNLOAD_SEGMENT_SIZE, total - 1))
+        segment_count = len(segments)
+    starts = [start for start, _ in segments]
+    # done — готовые куски, partial — сколько байт уже записано в начало недокачанных
+    done = set()
+    partial = {}
+    old_validator = meta.get("validator") or meta.get("etag") or meta.get("last_modified")
+    if meta.get("url") == url and validator and old_validator == validator:
+        if meta.get("segments") == starts and meta.get("size") == total and have == total:
+            done = set(meta.get("done", []))
+            partial = {int(index): written for index, written in meta.get("partial", {}).items()}
+        elif not meta.get("segments") and have:
+            # Недокачанное одним потоком тоже годится: его начало уже на месте
+            done = {i for i, (_, end) in enumerate(segments) if end < have}
+            if len(done) < segment_count and have > segments[len(done)][0]:
+                partial[len(done)] = have - segments[len(done)][0]
+    resumed = bool(done or partial)
+    if resumed:
+        with open(part_path, "r+b") as f:
+            f.truncate(total)
+        if log:
+            log(f"Продолжаем загрузку с {(sum(segments[i][1] - segments[i][0] + 1 for i in done) + sum(partial.values())) // (1024 * 1024)} МБ")
+    else:
+        with open(part_path, "wb") as f:
+            f.truncate(total)
+
+    # Пробный ответ годится как первый кусок, только если он его целиком и начало ещё не скачано
+    probe_usable = not head_done and 0 not in done and not partial.get(0)
+    if not probe_usable:
+        probe.close()
+    connections = min(DOWNLOAD_CONNECTIONS, segment_count)
+    lock = threading.Lock()
+    progress = {i: end - start + 1 for i, (start, end) in enumerate(segments) if i in done}
+    progress.update(partial)
+    state = {"contiguous": 0, "failed": False}
+
+    def save_meta():
+        write_json_atomic(meta_path, {"url": url, "validator": validator, "size": total, "segments": starts,
+                                      "done": sorted(done), "partial": partial})
+
+    def report(index, written):
+        # Вызывается под lock: прогресс общий и не убывает, ограничитель скорости тормозит все соединения
+        progress[index] = written
+        contiguous = state["contiguous"]
+        while contiguous < segment_count and progress.get(contiguous, 0) == segments[contiguous][1] - segments[contiguous][0] + 1:
+            contiguous += 1
+        state["contiguous"] = contiguous
+        if on_available:
+            on_available(segments[contiguous][0] + progress.get(contiguous, 0) if contiguous < segment_count else total)
+        if on_progress:
+            on_progress(sum(progress.values()), total)
+
+    def fetch_segment(index):
+        start, end = segments[index]
+        written = partial.get(index, 0)
+        try:
+            for attempt in range(retries):
+                resp = None
+                try:
+                    if index == 0 and attempt == 0 and probe_usable:
+                        resp = probe
+                    else:
+                        # Повтор продолжает кусок с того места, где он оборвался
+                        resp = session.get(segment_url, headers={"Range": f"bytes={start + written}-{end}",
+                                                                 "If-Range": if_range},
+                                           stream=True, timeout=DOWNLOAD_TIMEOUT)
+                        content_range = resp.headers.get("Content-Range", "")
+                        if resp.status_code != 206 or not content_range.startswith(f"bytes {start + written}-"):
+                            resp.raise_for_status()
+                            raise RangeNotSupported()  # файл на сервере поменялся
+                    with open(part_path, "r+b") as f:
+                        f.seek(start + written)
+                        for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            if state["failed"]:
+                                return
+                            chunk = chunk[:end + 1 - start - written]
+                            f.write(chunk)
+                            # Сразу на диск: распаковка читает .part своим дескриптором
+                            f.flush()
+                            written += len(chunk)
+                            with lock:
+                                report(index, written)
+                            if start + written > end:
+                                break
+                    if start + written <= end:
+                        raise requests.exceptions.ChunkedEncodingError(f"Кусок {start}-{end} оборвался")
+                    with lock:
+                        done.add(index)
+                        partial.pop(index, None)
+                        save_meta()
+                    return
+                except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                    if attempt == retries - 1:
+                        raise
+                    if log:
+                        log(f"Обрыв загрузки куска ({e.__class__.__name__}), повтор...")
+                    time.sleep(2 ** attempt)
+                finally:
+                    if resp is not None:
+                        resp.close()
+        finally:
+            # Записанное до остановки или ошибки (файл уже закрыт) пригодится при следующей загрузке
+            if index not in done and written:
+                with lock:
+                    if start + written > end:
+                        done.add(index)
+                        partial.pop(index, None)
+                    else:
+                        partial[index] = written
+                    save_meta()
+
+    with lock:
+        save_meta()
+        report(0, progress.get(0, 0))
+    pending = [i for i in range(segment_count) if i not in done]
+    with ThreadPoolExecutor(max_workers=connections, thread_name_prefix="segment") as pool:
+        futures = [pool.submit(fetch_segment, i) for i in pending]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            state["failed"] = True
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            probe.close()
+    # Файл из нескольких запросов (кусками или с докачкой) — finish_archive_download проверит CRC всех файлов:
+    # без сильного ETag куски не сверяются друг с другом через If-Range
+    return resumed or segment_count > 1
+
+def fetch_archive_part(url, part_path, meta_path, on_progress=None, log=None, on_available=None):
+    # Качает архив в part_path с повторами; возвращает True, если была докачка
+    import requests
+
+    if DOWNLOAD_CONNECTIONS > 1:
+        try:
+            return download_segmented(url, part_path, meta_path, on_progress, log, on_available=on_available)
+        except RangeNotSupported:
+            pass
+
+    def on_part_progress(downloaded, total):
+        if on_available:
+            on_available(downloaded)
+        if on_progress:
+            on_progress(downloaded, total)
+
+    resumed = False
+    for attempt in range(DOWNLOAD_RETRIES):
+        try:
+            resumed = download_part(url, part_path, meta_path, on_part_progress, log) or resumed
+            break
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            if attempt == DOWNLOAD_RETRIES - 1:
+                raise
+            if log:
+                log(f"Обрыв загрузки ({e.__class__.__name__}), повтор...")
+            time.sleep(2 ** attempt)
+    return resumed
+
+def finish_archive_download(path, resumed):
+    part_path = path + ".part"
+    meta_path = part_path + ".json"
+    meta, _ = load_partial_download(part_path, meta_path)
+    try:
+        check_archive(part_path, meta.get("size"), resumed)
+    except zipfile.BadZipFile:
+        discard_partial_download(part_path, meta_path)
+        raise
+    os.replace(part_path, path)
+    discard_partial_download(part_path, meta_path)
+
+def download_archive(url, path, on_progress=None, log=None):
+    # Недокачанный архив лежит рядом как .part вместе с ETag и ожидаемым размером
+    part_path = path + ".part"
+    resumed = fetch_archive_part(url, part_path, part_path + ".json", on_progress, log)
+    finish_archive_download(path, resumed)
+
+def evict_archive_cache(keep=None):
+    archives = []
+    for name in os.listdir(ARCHIVE_CACHE_PATH):
+        if name.endswith(".zip"):
+            path = os.path.join(ARCHIVE_CACHE_PATH, name)
+            st = os.stat(path)
+            archives.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in archives)
+    for _, size, path in sorted(archives):
+        if total <= ARCHIVE_CACHE_MAX_SIZE:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass  # архив может быть открыт другой установкой
+
+class PrefetchPaused(Exception):
+    pass
+
+class Prefetcher:
+    # Одна фоновая загрузка за раз в PREFETCH_PATH, готовый архив переносится в кэш архивов.
+    # Установка туда не заглядывает, поэтому .part фоновой загрузки и установки не пересекаются;
+    # прерванная загрузка продолжается с места остановки при следующем запросе
+    def __init__(self, log=print):
+        self.log = log
+        self.condition = threading.Condition()
+        self.reason = None
+        self.paused = 0
+        self.last_check = None
+        self.throttle_start = None
+        self.thread = None
+
+    def request(self, reason, force=False):
+        with self.condition:
+            if not force and self.last_check is not None \
+                    and time.monotonic() - self.last_check < PREFETCH_CHECK_INTERVAL:
+                return
+            self.reason = reason
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="prefetch", daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def pause(self):
+        with self.condition:
+            self.paused += 1
+            self.condition.notify_all()
+
+    def resume(self):
+        with self.condition:
+            self.paused = max(0, self.paused - 1)
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.reason is None or self.paused:
+                    self.condition.wait()
+                reason, self.reason = self.reason, None
+                self.last_check = time.monotonic()
+            try:
+                self.prefetch(reason)
+            except PrefetchPaused:
+                with self.condition:
+                    self.reason = self.reason or reason  # продолжим после установки
+            except Exception as e:
+                print(f"Фоновая загрузка архива не удалась: {e}")
+                self.log(f"Фоновая загрузка архива не удалась: {e}")
+
+    def prefetch(self, reason):
+        if FETCH_MODE != "zipball":
+            return
+        remaining = get_session().remaining()
+        if remaining is not None and remaining < RATE_LIMIT_RESERVE:
+            return  # остаток лимита нужнее установке
+        sha = resolve_commit_sha()
+        path = os.path.join(ARCHIVE_CACHE_PATH, f"{sha}.zip")
+        prefetch_path = os.path.join(PREFETCH_PATH, f"{sha}.zip")
+        # Недокачанные архивы прошлых коммитов больше не нужны
+        os.makedirs(PREFETCH_PATH, exist_ok=True)
+        for name in os.listdir(PREFETCH_PATH):
+            if not name.startswith(sha) or os.path.isfile(path):
+                try:
+                    os.remove(os.path.join(PREFETCH_PATH, name))
+                except OSError:
+                    pass
+        if os.path.isfile(path):
+            return
+
+        self.log(f"Фоновая загрузка архива коммита {sha[:7]} ({reason})")
+        self.throttle_start = None
+        download_archive(f"{API_REPO_URL}/zipball/{sha}", prefetch_path, on_progress=self.throttle)
+        os.makedirs(ARCHIVE_CACHE_PATH, exist_ok=True)
+        os.replace(prefetch_path, path)
+        evict_archive_cache(keep=path)
+        self.log(f"Архив коммита {sha[:7]} загружен заранее ({os.path.getsize(path) // (1024 * 1024)} МБ)")
+
+    def throttle(self, downloaded, total):
+        # После каждого куска: остановка ради установки и ограничение скорости
+        now = time.monotonic()
+        if self.throttle_start is None:
+            self.throttle_start = (now, downloaded)
+        start_time, start_bytes = self.throttle_start
+        with self.condition:
+            while True:
+                if self.paused:
+                    raise PrefetchPaused()
+                if not PREFETCH_RATE_LIMIT:
+                    return
+                delay = start_time + (downloaded - start_bytes) / PREFETCH_RATE_LIMIT - time.monotonic()
+                if delay <= 0:
+                    return
+                self.condition.wait(delay)
+
+class MappedArchive(io.RawIOBase):
+    # zipfile до Python 3.13 требует seekable(), которого у mmap нет
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        return self.mapped.read(size)
+
+    def readinto(self, b):
+        data = self.mapped.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self.mapped.seek(offset, whence)
+        return self.mapped.tell()
+
+    def tell(self):
+        return self.mapped.tell()
+
+    def close(self):
+        if not self.closed:
+            self.mapped.close()
+        super().close()
+
+def cached_archive_path(sha):
+    # Путь к архиву коммита в кэше и есть ли он там уже
+    os.makedirs(ARCHIVE_CACHE_PATH, exist_ok=True)
+    path = os.path.join(ARCHIVE_CACHE_PATH, f"{sha}.zip")
+    from_cache = os.path.isfile(path)
+    if from_cache:
+        os.utime(path)  # отметка последнего использования для LRU
+    return path, from_cache
+
+class ArchiveStream:
+    # Сколько байт архива уже лежит на диске; читатели ждут нужное смещение
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.available = 0
+        self.done = False
+
+    def update(self, available):
+        with self.condition:
+            self.available = available
+            self.condition.notify_all()
+
+    def finish(self, *args):
+        with self.condition:
+            self.done = True
+            self.condition.notify_all()
+
+    def wait_for(self, offset):
+        # False — загрузка закончилась (или оборвалась), а до offset так и не дошла
+        with self.condition:
+            while self.available < offset and not self.done:
+                self.condition.wait()
+            return self.available >= offset
+
+# Файл из локального заголовка zip: данные лежат с data_offset, compress_size байт
+StreamedMember = namedtuple("StreamedMember", "filename file_size compress_size CRC compress_type data_offset")
+
+ZIP_LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+
+def iter_streamed_members(part_path, stream):
+    # Идём по локальным заголовкам zip по мере загрузки. Останавливаемся на центральном каталоге
+    # и на всём, что так не прочитать (размеры в дескрипторе после данных, zip64, шифрование) —
+    # такие файлы распакуются обычным путём, когда архив скачается целиком
+    offset = 0
+    if not stream.wait_for(ZIP_LOCAL_HEADER.size):
+        return
+    with open(part_path, "rb") as f:
+        while stream.wait_for(offset + ZIP_LOCAL_HEADER.size):
+            f.seek(offset)
+            header = f.read(ZIP_LOCAL_HEADER.size)
+            if len(header) < ZIP_LOCAL_HEADER.size:
+                return
+            (signature, _, flags, compress_type, _, _, crc, compress_size, file_size,
+             name_length, extra_length) = ZIP_LOCAL_HEADER.unpack(header)
+            if signature != zipfile.stringFileHeader:
+                return
+            if flags & 0x9 or 0xFFFFFFFF in (compress_size, file_size):
+                return
+            if compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                return
+
+            data_offset = offset + ZIP_LOCAL_HEADER.size + name_length + extra_length
+            if not stream.wait_for(data_offset):
+                return
+            raw_name = f.read(name_length)
+            if len(raw_name) < name_length:
+                return
+            filename = raw_name.decode("utf-8" if flags & 0x800 else "cp437")
+            yield StreamedMember(filename, file_size, compress_size, crc, compress_type, data_offset)
+            offset = data_offset + compress_size
+
+def extract_streamed_member(part_path, member, target_path, on_bytes=None, sha=None):
+    # Распаковка одного файла прямо из недокачанного архива с проверкой CRC (и SHA блоба из манифеста)
+    buffer = getattr(_copy_buffers, "buffer", None)
+    if buffer is None:
+        buffer = _copy_buffers.buffer = memoryview(bytearray(COPY_BUFFER_SIZE))
+    decompressor = zlib.decompressobj(-15) if member.compress_type == zipfile.ZIP_DEFLATED else None
+    tmp_path = target_path + ".part"
+    crc = 0
+    written = 0
+    remaining = member.compress_size
+    blob_hash = hashlib.sha1(b"blob %d\0" % member.file_size) if sha else None
+    with open(part_path, "rb") as src, open(tmp_path, "wb") as target:
+        src.seek(member.data_offset)
+        while remaining:
+            size = src.readinto(buffer[:min(remaining, len(buffer))])
+            if not size:
+                break
+            remaining -= size
+            data = decompressor.decompress(buffer[:size]) if decompressor else bytes(buffer[:size])
+            target.write(data)
+            crc = zlib.crc32(data, crc)
+            if blob_hash:
+                blob_hash.update(data)
+            written += len(data)
+            if on_bytes:
+                on_bytes(len(data))
+        if decompressor:
+            data = decompressor.flush()
+            target.write(data)
+            crc = zlib.crc32(data, crc)
+            if blob_hash:
+                blob_hash.update(data)
+            written += len(data)
+            if on_bytes and data:
+                on_bytes(len(data))
+    if remaining or crc != member.CRC or written != member.file_size:
+        os.remove(tmp_path)
+        raise zipfile.BadZipFile(f"Файл {member.filename} не совпал с заголовком архива")
+    if blob_hash and blob_hash.hexdigest() != sha:
+        os.remove(tmp_path)
+        raise BlobMismatchError(f"Файл {member.filename} не совпадает с манифестом")
+    os.replace(tmp_path, target_path)
+
+def crc32_file(path):
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                return crc
+            crc = zlib.crc32(chunk, crc)
+
+def git_blob_sha(path):
+    # Тот же SHA-1, что Git считает для блоба: заголовок "blob <размер>\0" + содержимое
+    h = hashlib.sha1(b"blob %d\0" % os.path.getsize(path))
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                return h.hexdigest()
+            h.update(chunk)
+
+class HashIndex:
+    # Хеши локальных файлов по (размер, mtime), чтобы не перечитывать неизменённые моды
+    def __init__(self, path):
+        self.path = path
+        self.dirty = False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    def digest(self, file_path, kind, hash_func):
+        st = os.stat(file_path)
+        key = f"{kind}:{os.path.normcase(os.path.abspath(file_path))}"
+        cached = self.data.get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        value = hash_func(file_path)
+        self.data[key] = [st.st_size, st.st_mtime_ns, value]
+        self.dirty = True
+        return value
+
+    def record(self, file_path, kind, value):
+        st = os.stat(file_path)
+        key = f"{kind}:{os.path.normcase(os.path.abspath(file_path))}"
+        self.data[key] = [st.st_size, st.st_mtime_ns, value]
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        write_json_atomic(self.path, self.data)
+        self.dirty = False
+
+def is_file_current(source, entry, target_path, hash_index):
+    try:
+        if os.path.getsize(target_path) != entry.size:
+            return False
+        return hash_index.digest(target_path, source.digest_kind, source.digest_func) == entry.digest
+    except OSError:
+        return False
+
+def is_world_file_protected(world_relative_path):
+    return any(fnmatch.fnmatch(world_relative_path, pattern) for pattern in WORLD_PROTECTED_FILES)
+
+def remove_stale_files(folder_path, keep_paths):
+    # Удаляет из folder_path всё, чего нет в keep_paths (пути относительно folder_path)
+    removed = 0
+    for dirpath, dirnames, filenames in os.walk(folder_path, topdown=False):
+        for filename in filenames:
+            full_path = os.path.join(dirpath, filename)
+            relative_path = os.path.relpath(full_path, folder_path).replace(os.sep, "/")
+            if relative_path not in keep_paths:
+                os.remove(full_path)
+                removed += 1
+        if dirpath != folder_path and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return removed
+
+def is_loader_installer(relative_path):
+    return relative_path.startswith("versions/") and relative_path.count("/") == 1 \
+        and relative_path.endswith("-installer.jar")
+
+class InstallPlan:
+    # Что делать с каждым файлом модпака. Общий для распаковки во время загрузки
+    # и для обычного прохода по архиву, чтобы миры и счётчики не считались дважды
+    def __init__(self, minecraft_path, hash_index, link_roots=()):
+        self.minecraft_path = minecraft_path
+        self.hash_index = hash_index
+        self.link_roots = link_roots
+        self.world_names = set()
+        self.existing_worlds = set()
+        self.world_updates = {}
+        self.written_paths = set()
+        self.unchanged_paths = set()
+        self.created_dirs = set()
+        self.unchanged_files = 0
+        self.written_files = 0
+        self.linked_files = 0
+        self.protected_files = 0
+
+    def world_of(self, relative_path):
+        if relative_path.startswith("saves/"):
+            parts = relative_path.split("/")
+            if len(parts) > 1 and parts[1]:
+                return parts[1]
+        return None
+
+    def make_dirs(self, path):
+        if path not in self.created_dirs:
+            os.makedirs(path, exist_ok=True)
+            self.created_dirs.add(path)
+
+    def target(self, source, entry):
+        # Путь, куда записать файл, или None, если писать не нужно
+        relative_path = entry.path
+        if not relative_path or relative_path in self.written_paths or relative_path in self.unchanged_paths \
+                or relative_path == MANIFEST_NAME:
+            return None
+        target_path = pack_file_path(self.minecraft_path, relative_path)
+
+        # Мир, который уже был локально до установки: без WORLD_SYNC пропускаем,
+        # иначе сверяем по хешу, не трогая файлы игрока
+        world_name = self.world_of(relative_path)
+        if world_name and world_name not in self.world_names:
+            self.world_names.add(world_name)
+            if os.path.exists(os.path.join(self.minecraft_path, "saves", world_name)):
+                self.existing_worlds.add(world_name)
+        in_existing_world = world_name in self.existing_worlds
+        if in_existing_world:
+            if not WORLD_SYNC:
+                return None
+            world_relative_path = relative_path.split("/", 2)[2] if relative_path.count("/") > 1 else ""
+            if is_world_file_protected(world_relative_path) and os.path.exists(target_path):
+                # Запоминаем, чтобы второй проход по тому же файлу не посчитал его ещё раз
+                self.unchanged_paths.add(relative_path)
+                self.protected_files += 1
+                return None
+
+        if relative_path.endswith('/'):
+            self.make_dirs(target_path)
+            return None
+        if (INCREMENTAL_SYNC or in_existing_world) and is_file_current(source, entry, target_path, self.hash_index):
+            # Файл проверяется один раз, даже если план строится и при загрузке, и по целому архиву
+            self.unchanged_paths.add(relative_path)
+            self.unchanged_files += 1
+            return None
+        self.make_dirs(os.path.dirname(target_path))
+        if self.link_roots and relative_path.startswith(PROFILE_SHARED_FOLDERS) \
+                and self.link_shared(source, entry, target_path):
+            return None
+        return target_path
+
+    def link_shared(self, source, entry, target_path):
+        # Такой же файл уже есть у другого модпака — жёсткая ссылка на него вместо записи.
+        # Запись всегда идёт через .part и os.replace, поэтому общий файл потом не испортится
+        for root in self.link_roots:
+            shared_path = os.path.join(root, entry.path)
+            if not is_file_current(source, entry, shared_path, self.hash_index):
+                continue
+            tmp_path = target_path + ".part"
+            try:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                os.link(shared_path, tmp_path)
+                os.replace(tmp_path, target_path)
+            except OSError:
+                return False
+            self.hash_index.record(target_path, source.digest_kind, entry.digest)
+            self.written_paths.add(entry.path)
+            self.linked_files += 1
+            return True
+        return False
+
+    def prefetch_digests(self, source):
+        # Хеши уже лежащих файлов считаются параллельно; target() потом берёт их из индекса
+        paths = []
+        for entry in source.entries:
+            if entry.path.endswith("/") or not (INCREMENTAL_SYNC or entry.path.startswith("saves/")):
+                continue
+            candidates = [pack_file_path(self.minecraft_path, entry.path)]
+            if self.link_roots and entry.path.startswith(PROFILE_SHARED_FOLDERS):
+                candidates += [os.path.join(root, entry.path) for root in self.link_roots]
+            for path in candidates:
+                try:
+                    if os.path.getsize(path) == entry.size:
+                        paths.append(path)
+                        break
+                except OSError:
+                    pass
+        if len(paths) < 2:
+            return
+
+        def digest(path):
+            try:
+                self.hash_index.digest(path, source.digest_kind, source.digest_func)
+            except OSError:
+                pass
+        with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS, thread_name_prefix="hash") as pool:
+            list(pool.map(digest, paths))
+
+    def file_written(self, source, entry, target_path):
+        # Инсталлятор загрузчика удаляется сразу после запуска, его хеш не нужен
+        if not is_loader_installer(entry.path):
+            self.hash_index.record(target_path, source.digest_kind, entry.digest)
+        self.written_paths.add(entry.path)
+        self.written_files += 1
+        world_name = self.world_of(entry.path)
+        if world_name in self.existing_worlds:
+            self.world_updates[world_name] = self.world_updates.get(world_name, 0) + 1
+
+_copy_buffers = threading.local()
+
+def extract_file(source, entry, target_path, on_bytes=None, log=None):
+    buffer = getattr(_copy_buffers, "buffer", None)
+    if buffer is None:
+        buffer = _copy_buffers.buffer = memoryview(bytearray(COPY_BUFFER_SIZE))
+    # Пишем рядом и подменяем целиком: старый файл может быть жёсткой ссылкой из резервной копии
+    tmp_path = target_path + ".part"
+    try:
+        copy_stream(source.open(entry), tmp_path, buffer, on_bytes)
+    except BlobMismatchError as e:
+        # Файл с LAN-зеркала или из архива не сошёлся с хешем из репозитория — этот файл берём с GitHub
+        if log:
+            log(f"{e}, загрузка с GitHub")
+        copy_stream(source.open_github(entry), tmp_path, buffer, on_bytes)
+    os.replace(tmp_path, target_path)
+
+def copy_stream(src, target_path, buffer, on_bytes=None):
+    with src, open(target_path, "wb") as target:
+        while True:
+            size = src.readinto(buffer)
+            if not size:
+                break
+            target.write(buffer[:size])
+            if on_bytes:
+                on_bytes(size)
+
+class ProgressModel:
+    # Фазы установки и их доля в общей полосе прогресса (в процентах)
+    ZIPBALL_PHASES = (("prepare", 2), ("download", 48), ("extract", 40), ("loader", 7), ("servers", 3))
+    # В режиме "tree" загрузка идёт вместе с записью файлов
+    TREE_PHASES = (("prepare", 2), ("listing", 3), ("extract", 85), ("loader", 7), ("servers", 3))
+    # "tree" перешёл на архив (список обрезан или мало лимита): после списка файлов — загрузка архива
+    TREE_ARCHIVE_PHASES = (("prepare", 2), ("listing", 3), ("download", 45), ("extract", 40), ("loader", 7),
+                           ("servers", 3))
+
+    def __init__(self, on_update, phases=ZIPBALL_PHASES, tracer=None):
+        self.on_update = on_update
+        self.tracer = tracer
+        self.lock = threading.Lock()
+        self.set_phases(phases)
+        self.phase = None
+        self.remote = False
+        self.phase_done = 0
+        self.phase_total = 0
+        self.files_done = 0
+        self.files_total = 0
+        self.downloaded_bytes = 0
+        self.written_bytes = 0
+        self.samples = deque()
+        self.last_emit = 0.0
+
+    def set_phases(self, phases):
+        bands = {}
+        start = 0
+        for name, weight in phases:
+            bands[name] = (start, start + weight)
+            start += weight
+        self.bands = bands
+
+    def start_phase(self, name, total_bytes=0, total_files=0, remote=False):
+        # remote: байты фазы идут из сети (загрузка архива или файлов в режиме "tree")
+        with self.lock:
+            self.phase = name
+            self.remote = remote
+            self.phase_done = 0
+            self.phase_total = total_bytes
+            self.files_done = 0
+            self.files_total = total_files
+            self.samples.clear()
+        if self.tracer:
+            self.tracer.phase(name)
+        self.emit(force=True)
+
+    def set_downloaded(self, done, total=0):
+        with self.lock:
+            self.downloaded_bytes += done - self.phase_done
+            self.phase_done = done
+            if total:
+                self.phase_total = total
+        self.emit()
+
+    def add_written(self, size):
+        with self.lock:
+            self.written_bytes += size
+            # Во время загрузки архива файлы пишутся параллельно, фазу двигает только загрузка
+            if self.phase != "download":
+                if self.remote:
+                    self.downloaded_bytes += size
+                self.phase_done += size
+        self.emit()
+
+    def file_done(self, count=1):
+        with self.lock:
+            self.files_done += count
+        self.emit()
+
+    def finish(self):
+        with self.lock:
+            self.phase = "done"
+            self.phase_done = self.phase_total
+        if self.tracer:
+            self.tracer.phase(None)
+        self.emit(force=True)
+
+    def snapshot(self, now=None):
+        now = time.monotonic() if now is None else now
+        rate = 0.0
+        if len(self.samples) > 1:
+            first_time, first_done = self.samples[0]
+            last_time, last_done = self.samples[-1]
+            if last_time > first_time:
+                rate = (last_done - first_done) / (last_time - first_time)
+
+        if self.phase == "done":
+            percent, fraction = 100, 1.0
+        else:
+            if self.phase_total:
+                fraction = min(self.phase_done / self.phase_total, 1.0)
+            elif self.files_total:
+                fraction = min(self.files_done / self.files_total, 1.0)
+            else:
+                fraction = 0.0
+            band_start, band_end = self.bands.get(self.phase, (0, 0))
+            percent = band_start + int((band_end - band_start) * fraction)
+
+        eta = None
+        if rate > 0 and self.phase_total > self.phase_done:
+            eta = (self.phase_total - self.phase_done) / rate
+        return {
+            "phase": self.phase,
+            "remote": self.remote,
+            "percent": percent,
+            "phase_done": self.phase_done,
+            "phase_total": self.phase_total,
+            "files_done": self.files_done,
+            "files_total": self.files_total,
+            "downloaded_bytes": self.downloaded_bytes,
+            "written_bytes": self.written_bytes,
+            "rate": rate,
+            "eta": eta,
+        }
+
+    def emit(self, force=False):
+        now = time.monotonic()
+        with self.lock:
+            self.samples.append((now, self.phase_done))
+            while len(self.samples) > 2 and now - self.samples[0][0] > PROGRESS_RATE_WINDOW:
+                self.samples.popleft()
+            if not force and now - self.last_emit < PROGRESS_INTERVAL:
+                return
+            self.last_emit = now
+            # Отправка под блокировкой, чтобы обновления из разных потоков не приходили задом наперёд
+            self.on_update(self.snapshot(now))
+
+class Tracer:
+    # События установки в формате Chrome trace: "X" — отрезок с длительностью, "C" — счётчик.
+    # Время в микросекундах от создания трассы, tid — поток, в котором шёл отрезок
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.events = []
+        self.counters = {}
+        self.threads = {}
+        self.phase_span = None
+
+    def now(self):
+        return (time.perf_counter() - self.started) * 1_000_000
+
+    def add(self, event):
+        thread = threading.current_thread()
+        event.setdefault("tid", thread.ident)
+        event["pid"] = os.getpid()
+        with self.lock:
+            self.threads[thread.ident] = thread.name
+            self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name, **args):
+        # В args можно дописывать значения внутри with — они попадут в событие
+        start = self.now()
+        try:
+            yield args
+        except BaseException as e:
+            args["error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            self.add({"name": name, "cat": "install", "ph": "X", "ts": start, "dur": self.now() - start, "args": args})
+
+    def phase(self, name):
+        # Фазы идут друг за другом: начало новой закрывает предыдущую
+        now = self.now()
+        if self.phase_span is not None:
+            phase_name, start, tid = self.phase_span
+            self.add({"name": phase_name, "cat": "phase", "ph": "X", "ts": start, "dur": now - start, "tid": tid})
+        self.phase_span = (name, now, threading.get_ident()) if name else None
+
+    def count(self, name, value=1):
+        with self.lock:
+            total = self.counters[name] = self.counters.get(name, 0) + value
+        self.add({"name": name, "ph": "C", "ts": self.now(), "args": {name: total}})
+
+    def save(self, path, metadata=None):
+        self.phase(None)
+        with self.lock:
+            events = list(self.events)
+            threads = dict(self.threads)
+            counters = dict(self.counters)
+        pid = os.getpid()
+        events += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                   for tid, name in threads.items()]
+        write_json_atomic(path, {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {**(metadata or {}), "counters": counters},
+        })
+
+def prune_traces():
+    # Трассы и профили одной установки называются одинаково, удаляются парой
+    try:
+        names = os.listdir(TRACE_PATH)
+    except OSError:
+        return
+    stamps = sorted({os.path.splitext(name)[0] for name in names if name.endswith((".json", ".prof"))})
+    for stamp in stamps[:-TRACE_KEEP_LAST] if TRACE_KEEP_LAST else stamps:
+        for ext in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(TRACE_PATH, stamp + ext))
+            except OSError:
+                pass
+
+PHASE_TITLES = {
+    "prepare": "Подготовка",
+    "listing": "Список файлов модпака",
+    "download": "Загрузка архива",
+    "extract": "Запись файлов",
+    "loader": "Установка загрузчика",
+    "servers": "Список серверов",
+    "done": "Готово",
+}
+
+def format_size(size):
+    return f"{size / (1024 * 1024):.1f} МБ"
+
+def format_progress(snapshot):
+    # Сеть или диск: в режиме "tree" запись файлов упирается в загрузку
+    title = PHASE_TITLES.get(snapshot["phase"], "")
+    if snapshot["phase"] == "extract" and snapshot["remote"]:
+        title = "Загрузка файлов"
+    parts = [title]
+    if snapshot["phase_total"]:
+        parts.append(f"{format_size(snapshot['phase_done'])} из {format_size(snapshot['phase_total'])}")
+    elif snapshot["phase_done"]:
+        parts.append(format_size(snapshot["phase_done"]))
+    if snapshot["files_total"]:
+        parts.append(f"файлов {snapshot['files_done']}/{snapshot['files_total']}")
+    if snapshot["rate"] > 0 and snapshot["phase"] in ("download", "extract"):
+        parts.append(f"{format_size(snapshot['rate'])}/с")
+    if snapshot["eta"] is not None:
+        minutes, seconds = divmod(int(snapshot["eta"]), 60)
+        parts.append(f"осталось {minutes}:{seconds:02d}")
+    return " · ".join(parts)
+
+def estimate_archive_size():
+    # GitHub не всегда присылает Content-Length для zipball — оцениваем по сохранённому списку модпаков
+    listing = load_modpack_list_cache()
+    if not listing:
+        return 0
+    return sum(pack.get("size") or 0 for pack in listing.get("packs", []))
+
+# Файл модпака: путь относительно папки модпака, размер и хеш (CRC32 для zip, sha блоба для tree)
+PackEntry = namedtuple("PackEntry", "path size digest")
+
+class ZipPackSource:
+    digest_kind = "crc32"
+    digest_func = staticmethod(crc32_file)
+    # Без манифеста план строится уже по открытому архиву
+    pending_files = None
+
+    def __init__(self, archive, z, prefix):
+        self.max_workers = EXTRACT_WORKERS
+        self.archive = archive
+        self.z = z
+        self.members = {}
+        self.entries = []
+        for info in z.infolist():
+            if not info.filename.startswith(prefix):
+                continue
+            relative_path = info.filename[len(prefix):]
+            if not relative_path:
+                continue
+            self.members[relative_path] = info
+            self.entries.append(PackEntry(relative_path, info.file_size, info.CRC))
+
+    def open(self, entry):
+        return self.z.open(self.members[entry.path])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.z.close()
+        self.archive.close()
+
+def open_github_blob(sha):
+    resp = get_session().get(f"{API_REPO_URL}/git/blobs/{sha}",
+                             headers={"Accept": "application/vnd.github.raw"}, stream=True)
+    resp.raise_for_status()
+    resp.raw.decode_content = True
+    return resp.raw
+
+class TreePackSource:
+    digest_kind = "git"
+    digest_func = staticmethod(git_blob_sha)
+    pending_files = None
+
+    def __init__(self, items, mirror_url=None):
+        self.max_workers = DOWNLOAD_WORKERS
+        self.entries = [PackEntry(item["path"], item.get("size", 0), item["sha"]) for item in items]
+        self.mirror_url = mirror_url
+        self.lock = threading.Lock()
+        self.mirror_files = 0
+
+    def open(self, entry):
+        # Сначала LAN-зеркало, если оно есть: файл ищется там по SHA блоба
+        mirror_url = self.mirror_url
+        if mirror_url:
+            import requests
+            try:
+                resp = get_mirror_session().get(f"{mirror_url}/blobs/{entry.digest}", params={"path": entry.path},
+                                                stream=True, timeout=DOWNLOAD_TIMEOUT)
+                if resp.status_code == 200:
+                    resp.raw.decode_content = True
+                    with self.lock:
+                        self.mirror_files += 1
+                    return VerifiedBlobReader(resp.raw, entry.size, entry.digest, entry.path)
+                resp.close()
+            except requests.RequestException:
+                self.mirror_url = None  # зеркало пропало — дальше только GitHub
+        return self.open_github(entry)
+
+    def open_github(self, entry):
+        return open_github_blob(entry.digest)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+class ManifestPackSource:
+    # Файлы по манифесту: план готов до загрузки, архив подключается, только если есть что писать.
+    # Содержимое из архива сверяется с SHA из манифеста по ходу записи
+    digest_kind = "git"
+    digest_func = staticmethod(git_blob_sha)
+
+    def __init__(self, manifest, modpack_name):
+        self.max_workers = EXTRACT_WORKERS
+        self.modpack_name = modpack_name
+        self.entries = [PackEntry(item["path"], item["size"], item["sha"]) for item in manifest["files"]]
+        self.roles = {item["path"]: item.get("role", "other") for item in manifest["files"]}
+        self.pending_files = []
+        self.archive = None
+        self.z = None
+        self.prefix = None
+
+    def attach(self, archive):
+        # Нужные файлы берутся из архива по имени, без прохода по всему списку
+        self.archive = archive
+        self.z = zipfile.ZipFile(archive)
+        root_folder = archive_root(self.z)
+        if root_folder is None:
+            return False
+        self.prefix = f"{root_folder}modpacks/{self.modpack_name}/"
+        return True
+
+    def open(self, entry):
+        try:
+            src = self.z.open(self.prefix + entry.path)
+        except KeyError:
+            raise BlobMismatchError(f"Файла {entry.path} из манифеста нет в архиве")
+        return VerifiedBlobReader(src, entry.size, entry.digest, entry.path)
+
+    def open_github(self, entry):
+        return open_github_blob(entry.digest)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.z:
+            self.z.close()
+        if self.archive:
+            self.archive.close()
+
+def archive_root(z):
+    # Корневая папка zipball "<владелец>-<репозиторий>-<sha>/" — первая запись архива
+    for name in z.namelist():
+        if name.endswith('/') and '/' not in name[:-1]:
+            return name
+    return None
+
+def open_zip_source(archive, modpack_name):
+    z = zipfile.ZipFile(archive)
+    root_folder = archive_root(z)
+
+    if root_folder is None:
+        z.close()
+        archive.close()
+        return None
+    return ZipPackSource(archive, z, f"{root_folder}modpacks/{modpack_name}/")
+
+class MirrorError(Exception):
+    pass
+
+MIRROR_APP_ID = "endlinkerio"
+# Своё зеркало в том же процессе отвечает на поиск тоже — по этому id его не принимаем за чужое
+INSTANCE_ID = os.urandom(8).hex()
+
+_mirror_session = None
+
+def get_mirror_session():
+    # Без токена: токен GitHub не должен уходить на другие компьютеры в сети
+    global _mirror_session
+    if _mirror_session is None:
+        import requests
+        _mirror_session = requests.Session()
+    return _mirror_session
+
+_mirror_lookup = None
+
+def find_mirror():
+    # Адрес зеркала из настроек или первое ответившее в сети; поиск — один раз, пока зеркало отвечает
+    global _mirror_lookup
+    if MIRROR_URL:
+        return MIRROR_URL.rstrip("/")
+    if not MIRROR_DISCOVERY:
+        return None
+    if _mirror_lookup is None:
+        _mirror_lookup = [discover_mirror()]
+    return _mirror_lookup[0]
+
+def forget_mirror():
+    global _mirror_lookup
+    _mirror_lookup = None
+
+def discover_mirror():
+    request = json.dumps({"app": MIRROR_APP_ID, "repo": GITHUB_REPO, "instance": INSTANCE_ID}).encode()
+    deadline = time.monotonic() + MIRROR_DISCOVERY_TIMEOUT
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            sock.sendto(request, (MIRROR_DISCOVERY_ADDRESS, MIRROR_DISCOVERY_PORT))
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                sock.settimeout(remaining)
+                data, (host, _) = sock.recvfrom(1024)
+                try:
+                    reply = json.loads(data)
+                except ValueError:
+                    continue
+                if isinstance(reply, dict) and reply.get("app") == MIRROR_APP_ID \
+                        and reply.get("repo") == GITHUB_REPO and reply.get("instance") != INSTANCE_ID \
+                        and isinstance(reply.get("port"), int):
+                    return f"http://{host}:{reply['port']}"
+    except OSError:
+        return None  # нет сети или никто не ответил
+
+class BlobMismatchError(Exception):
+    pass
+
+class VerifiedBlobReader:
+    # Блоб с зеркала или из архива: SHA считается по ходу чтения и в конце сверяется с репозиторием
+    def __init__(self, raw, size, sha, path):
+        self.raw = raw
+        self.sha = sha
+        self.path = path
+        self.hash = hashlib.sha1(b"blob %d\0" % size)
+
+    def readinto(self, buffer):
+        size = self.raw.readinto(buffer)
+        if size:
+            self.hash.update(buffer[:size])
+        elif self.hash.hexdigest() != self.sha:
+            raise BlobMismatchError(f"Файл {self.path} не совпадает с репозиторием")
+        return size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.raw.close()
+
+def verify_archive_tree(path, sha):
+    # Архив с зеркала сверяется с деревом коммита на GitHub: тот же набор файлов и SHA блоба каждого
+    response = get_session().get(f"{API_REPO_URL}/git/trees/{sha}", params={"recursive": "1"})
+    response.raise_for_status()
+    data = response.json()
+    if data.get("truncated"):
+        raise MirrorError("Дерево коммита слишком большое, архив с зеркала не проверить")
+    expected = {item["path"]: item["sha"] for item in data["tree"] if item["type"] == "blob"}
+
+    with zipfile.ZipFile(path) as z:
+        infos = z.infolist()
+        prefix = infos[0].filename if infos and infos[0].is_dir() else ""
+        members = {info.filename[len(prefix):]: info for info in infos
+                   if not info.is_dir() and info.filename.startswith(prefix)}
+        if members.keys() != expected.keys():
+            raise MirrorError("Состав архива с зеркала не совпадает с коммитом")
+
+        def check(relative_path):
+            info = members[relative_path]
+            h = hashlib.sha1(b"blob %d\0" % info.file_size)
+            with z.open(info) as f:
+                while True:
+                    chunk = f.read(COPY_BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+            if h.hexdigest() != expected[relative_path]:
+                raise MirrorError(f"Файл {relative_path} в архиве с зеркала не совпадает с репозиторием")
+
+        with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as pool:
+            for future in as_completed([pool.submit(check, relative_path) for relative_path in members]):
+                future.result()
+
+def fetch_mirror_archive(mirror_url, sha, path, on_progress=None, log=None):
+    # Без повторов: при любой ошибке зеркала архив качается с GitHub
+    part_path = path + ".part"
+    meta_path = part_path + ".json"
+    url = f"{mirror_url}/archives/{sha}.zip"
+    try:
+        if DOWNLOAD_CONNECTIONS <= 1:
+            raise RangeNotSupported()
+        resumed = download_segmented(url, part_path, meta_path, on_progress, log, get_mirror_session(), retries=1)
+    except RangeNotSupported:
+        resumed = download_part(url, part_path, meta_path, on_progress, log, get_mirror_session())
+    try:
+        verify_archive_tree(part_path, sha)
+    except (MirrorError, zipfile.BadZipFile):
+        discard_partial_download(part_path, meta_path)
+        raise
+    finish_archive_download(path, resumed)
+
+class ManifestError(Exception):
+    pass
+
+MANIFEST_ROLES = (
+    ("mods/", "mod"), ("config/", "config"), ("resourcepacks/", "resourcepack"),
+    ("shaderpacks/", "shaderpack"), ("saves/", "world"), ("versions/", "version"),
+)
+
+def file_role(relative_path):
+    if is_loader_installer(relative_path):
+        return "installer"
+    if relative_path == "server.txt":
+        return "server"
+    for prefix, role in MANIFEST_ROLES:
+        if relative_path.startswith(prefix):
+            return role
+    return "other"
+
+def git_tree_sha(folder, blob_shas, relative_prefix=""):
+    # SHA дерева так же, как его считает Git; None для папки без файлов (в Git её нет)
+    entries = []
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if os.path.isdir(path):
+            sha = git_tree_sha(path, blob_shas, f"{relative_prefix}{name}/")
+            if sha:
+                entries.append((f"{name}/".encode(), b"40000", name, sha))
+        else:
+            executable = os.name != "nt" and os.access(path, os.X_OK)
+            entries.append((name.encode(), b"100755" if executable else b"100644", name,
+                            blob_shas[relative_prefix + name]))
+    if not entries:
+        return None
+    entries.sort()
+    body = b"".join(mode + b" " + name.encode() + b"\0" + bytes.fromhex(sha) for _, mode, name, sha in entries)
+    return hashlib.sha1(b"tree %d\0" % len(body) + body).hexdigest()
+
+def build_manifest(pack_path):
+    # Хеши совпадут с репозиторием, если файлы лежат так же, как в коммите
+    # (на Windows с core.autocrlf=true текстовые файлы разойдутся — установка тогда обойдётся без манифеста)
+    files = []
+    for dirpath, _, filenames in os.walk(pack_path):
+        for filename in filenames:
+            relative_path = os.path.relpath(os.path.join(dirpath, filename), pack_path).replace(os.sep, "/")
+            if relative_path != MANIFEST_NAME:
+                files.append(relative_path)
+    files.sort()
+    with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as pool:
+        shas = dict(zip(files, pool.map(lambda path: git_blob_sha(os.path.join(pack_path, path)), files)))
+
+    # SHA верхнего уровня модпака — по ним установка сверяет манифест с коммитом одним запросом
+    trees = {}
+    for name in sorted(os.listdir(pack_path)):
+        path = os.path.join(pack_path, name)
+        if name == MANIFEST_NAME:
+            continue
+        sha = git_tree_sha(path, shas, f"{name}/") if os.path.isdir(path) else shas[name]
+        if sha:
+            trees[name] = sha
+    return {
+        "version": MANIFEST_VERSION,
+        "files": [{
+            "path": path,
+            "size": os.path.getsize(os.path.join(pack_path, path)),
+            "sha": shas[path],
+            "role": file_role(path),
+        } for path in files],
+        "trees": trees,
+    }
+
+def write_manifest(pack_path):
+    manifest = build_manifest(pack_path)
+    path = os.path.join(pack_path, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, path)
+    return manifest
+
+def fetch_manifest(modpack_name, sha):
+    # Манифест модпака в коммите sha или None, если его нет. ManifestError — манифест
+    # не совпадает с содержимым папки модпака (забыли пересоздать перед коммитом)
+    response = get_session().get(f"{API_REPO_URL}/contents/modpacks/{modpack_name}", params={"ref": sha})
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    items = response.json()
+    if not isinstance(items, list):
+        return None
+    listing = {item["name"]: item["sha"] for item in items}
+    manifest_sha = listing.pop(MANIFEST_NAME, None)
+    if manifest_sha is None:
+        return None
+
+    blob = get_session().get(f"{API_REPO_URL}/git/blobs/{manifest_sha}",
+                             headers={"Accept": "application/vnd.github.raw"})
+    blob.raise_for_status()
+    manifest = json.loads(blob.content)
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        raise ManifestError("неизвестная версия манифеста")
+    if manifest.get("trees") != listing:
+        raise ManifestError("манифест не совпадает с файлами модпака")
+    return manifest
+
+def fetch_modpack_tree(modpack_name):
+    # Спускаемся корень -> modpacks -> <модпак>, рекурсивный листинг только внутри модпака
+    tree_sha = BRANCH
+    for part in ("modpacks", modpack_name):
+        response = get_session().get(f"{API_REPO_URL}/git/trees/{tree_sha}")
+        response.raise_for_status()
+        for item in response.json()["tree"]:
+            if item["path"] == part and item["type"] == "tree":
+                tree_sha = item["sha"]
+                break
+        else:
+            return None, False
+
+    response = get_session().get(f"{API_REPO_URL}/git/trees/{tree_sha}", params={"recursive": "1"})
+    response.raise_for_status()
+    data = response.json()
+    blobs = [item for item in data["tree"] if item["type"] == "blob"]
+    return blobs, data.get("truncated", False)
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                return h.hexdigest()
+            h.update(chunk)
+
+def link_or_copy(src, dst):
+    # Жёсткая ссылка не занимает места; если ФС её не умеет — обычное копирование
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def load_installed_state():
+    return read_json_file(INSTALLED_STATE_PATH)
+
+def save_installed_state(modpack_name):
+    state = load_installed_state()
+    state.update({"pack": modpack_name, "installed": time.time()})
+    write_json_atomic(INSTALLED_STATE_PATH, state)
+
+def applied_servers_sha(game_path):
+    # SHA блоба server.txt, серверы из которого уже добавлены в servers.dat этой папки игры
+    return load_installed_state().get("servers", {}).get(os.path.normcase(os.path.abspath(game_path)))
+
+def save_applied_servers(game_path, sha):
+    state = load_installed_state()
+    state.setdefault("servers", {})[os.path.normcase(os.path.abspath(game_path))] = sha
+    write_json_atomic(INSTALLED_STATE_PATH, state)
+
+def profiles_path():
+    return os.path.join(MINECRAFT_PATH, PROFILES_FOLDER_NAME)
+
+def check_modpack_name(modpack_name):
+    # Имя модпака становится папкой профиля: ни разделителей, ни ".." — иначе путь уйдёт из .minecraft
+    if not modpack_name or modpack_name.strip(". ") == "" or re.search(r'[\\/:*?"<>|\x00-\x1f]', modpack_name):
+        raise InstallError(f"Имя модпака '{modpack_name}' содержит недопустимые символы.")
+
+def pack_game_path(modpack_name):
+    # Папка игры модпака: своя в режиме профилей, иначе общая .minecraft
+    return os.path.join(profiles_path(), modpack_name) if PROFILE_MODE else MINECRAFT_PATH
+
+def pack_file_path(game_path, relative_path):
+    # Версии и их инсталляторы всегда в общей .minecraft: лаунчер берёт версии оттуда при любом gameDir
+    root = MINECRAFT_PATH if relative_path.startswith("versions/") else game_path
+    return os.path.join(root, relative_path)
+
+def game_paths():
+    # Все папки игры: общая .minecraft и папки профилей модпаков
+    paths = [MINECRAFT_PATH]
+    try:
+        names = sorted(os.listdir(profiles_path()))
+    except OSError:
+        names = []
+    for name in names:
+        path = os.path.join(profiles_path(), name)
+        if os.path.isdir(path):
+            paths.append(path)
+    return paths
+
+def register_launcher_profile(modpack_name, game_path, version_ids=None):
+    # Профиль модпака в launcher_profiles.json; свежий lastUsed делает его выбранным в лаунчере
+    profiles_file = os.path.join(MINECRAFT_PATH, "launcher_profiles.json")
+    data = {}
+    if os.path.exists(profiles_file):
+        try:
+            with open(profiles_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            # Чужие профили не затираем
+            raise InstallError(f"Не удалось прочитать launcher_profiles.json: {e}")
+    profile_id = "endlinkerio-" + hashlib.sha1(modpack_name.encode("utf-8")).hexdigest()[:12]
+    # С миллисекундами: при быстром переключении выбранным должен остаться последний профиль
+    timestamp = time.time()
+    now = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(timestamp)) + f".{int(timestamp % 1 * 1000):03d}Z"
+    profile = data.setdefault("profiles", {}).setdefault(profile_id, {"created": now, "type": "custom", "icon": "Furnace"})
+    profile.update({"name": modpack_name, "gameDir": game_path, "lastUsed": now})
+    if version_ids:
+        profile["lastVersionId"] = version_ids[0]
+    profile.setdefault("lastVersionId", "latest-release")
+    write_json_atomic(profiles_file, data)
+    return profile_id
+
+class BackupStore:
+    # Резервные копии mods: снимок — маленький JSON со списком файлов, сами jar лежат
+    # один раз в objects/ по SHA-256 и подключаются жёсткими ссылками
+    def __init__(self, minecraft_path):
+        self.root = os.path.join(minecraft_path, BACKUP_FOLDER_NAME)
+        self.objects_path = os.path.join(self.root, "objects")
+        self.snapshots_path = os.path.join(self.root, "snapshots")
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_path, digest[:2], digest)
+
+    def list_snapshots(self):
+        snapshots = []
+        if not os.path.isdir(self.snapshots_path):
+            return snapshots
+        for name in os.listdir(self.snapshots_path):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.snapshots_path, name), "r", encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        snapshots.sort(key=lambda snapshot: snapshot["created"], reverse=True)
+        return snapshots
+
+    def create_snapshot(self, mods_path, pack=None, hash_index=None):
+        # Возвращает (снимок, новых объектов) или (None, 0), если сохранять нечего
+        files = []
+        new_objects = 0
+        if os.path.isdir(mods_path):
+            for dirpath, _, filenames in os.walk(mods_path):
+                for filename in filenames:
+                    full_path = os.path.join(dirpath, filename)
+                    if hash_index is not None:
+                        digest = hash_index.digest(full_path, "sha256", sha256_file)
+                    else:
+                        digest = sha256_file(full_path)
+                    object_path = self.object_path(digest)
+                    if not os.path.exists(object_path):
+                        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                        link_or_copy(full_path, object_path)
+                        new_objects += 1
+                    relative_path = os.path.relpath(full_path, mods_path).replace(os.sep, "/")
+                    files.append({"path": relative_path, "sha256": digest, "size": os.path.getsize(full_path)})
+        if not files:
+            return None, 0
+
+        files.sort(key=lambda item: item["path"])
+        snapshots = self.list_snapshots()
+        if snapshots and snapshots[0]["files"] == files:
+            return None, 0  # mods не менялись с прошлой копии
+
+        snapshot_id = time.strftime("%Y%m%d-%H%M%S")
+        suffix = 1
+        while os.path.exists(os.path.join(self.snapshots_path, f"{snapshot_id}.json")):
+            suffix += 1
+            snapshot_id = time.strftime("%Y%m%d-%H%M%S") + f"-{suffix}"
+        snapshot = {"id": snapshot_id, "created": time.time(), "pack": pack, "files": files}
+        write_json_atomic(os.path.join(self.snapshots_path, f"{snapshot_id}.json"), snapshot)
+        return snapshot, new_objects
+
+    def restore_snapshot(self, snapshot, mods_path, hash_index=None):
+        # Возвращает (восстановлено, без изменений, удалено лишних)
+        restored = 0
+        unchanged = 0
+        wanted = {item["path"]: item for item in snapshot["files"]}
+        for relative_path, item in wanted.items():
+            target_path = os.path.join(mods_path, relative_path)
+            if os.path.isfile(target_path) and os.path.getsize(target_path) == item["size"]:
+                if hash_index is not None:
+                    digest = hash_index.digest(target_path, "sha256", sha256_file)
+                else:
+                    digest = sha256_file(target_path)
+                if digest == item["sha256"]:
+                    unchanged += 1
+                    continue
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            tmp_path = target_path + ".part"
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            link_or_copy(self.object_path(item["sha256"]), tmp_path)
+            os.replace(tmp_path, target_path)
+            restored += 1
+        os.makedirs(mods_path, exist_ok=True)
+        removed = remove_stale_files(mods_path, set(wanted))
+        return restored, unchanged, removed
+
+    def apply_retention(self):
+        # Оставляем BACKUP_KEEP_LAST последних копий и укладываемся в BACKUP_MAX_SIZE
+        snapshots = self.list_snapshots()
+        removed = 0
+        while len(snapshots) > 1:
+            referenced = {}
+            for snapshot in snapshots:
+                for item in snapshot["files"]:
+                    referenced[item["sha256"]] = item["size"]
+            if len(snapshots) <= BACKUP_KEEP_LAST and sum(referenced.values()) <= BACKUP_MAX_SIZE:
+                break
+            oldest = snapshots.pop()
+            os.remove(os.path.join(self.snapshots_path, f"{oldest['id']}.json"))
+            removed += 1
+        self.collect_garbage(snapshots)
+        return removed
+
+    def collect_garbage(self, snapshots):
+        referenced = {item["sha256"] for snapshot in snapshots for item in snapshot["files"]}
+        if not os.path.isdir(self.objects_path):
+            return
+        for dirpath, _, filenames in os.walk(self.objects_path, topdown=False):
+            for filename in filenames:
+                if filename not in referenced:
+                    os.remove(os.path.join(dirpath, filename))
+            if dirpath != self.objects_path and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+
+def format_snapshot(snapshot):
+    created = time.strftime("%d.%m.%Y %H:%M", time.localtime(snapshot["created"]))
+    pack = snapshot.get("pack") or "без названия"
+    return f"{created} · {pack} · модов: {len(snapshot['files'])}"
+
+def read_json_file(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def java_candidates():
+    # Java из PATH, JAVA_HOME и рантаймы, которые скачал лаунчер Minecraft
+    java_name = "java.exe" if sys.platform == "win32" else "java"
+    candidates = [shutil.which("java")]
+    if os.getenv("JAVA_HOME"):
+        candidates.append(os.path.join(os.getenv("JAVA_HOME"), "bin", java_name))
+    runtime_roots = [os.path.join(MINECRAFT_PATH, "runtime")]
+    if os.getenv("LOCALAPPDATA"):
+        runtime_roots.append(os.path.join(os.getenv("LOCALAPPDATA"), "Packages",
+                                          "Microsoft.4297127D64EC6_8wekyb3d8bbwe", "LocalCache", "Local", "runtime"))
+    for runtime_root in runtime_roots:
+        candidates.extend(sorted(glob.glob(os.path.join(runtime_root, "*", "*", "*", "bin", java_name)), reverse=True))
+    return [path for path in candidates if path]
+
+def find_java():
+    # Проверенные java запоминаются по (размер, mtime), чтобы не запускать JVM ради "java -version"
+    cache = read_json_file(JAVA_CACHE_PATH)
+    found = None
+    for candidate in java_candidates():
+        path = os.path.realpath(candidate)
+        try:
+            st = os.stat(path)
+        except OSError:
+            cache.pop(path, None)
+            continue
+        cached = cache.get(path)
+        if cached and cached["size"] == st.st_size and cached["mtime"] == st.st_mtime_ns:
+            found = path
+            break
+        try:
+            result = subprocess.run(
+                [path, "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+            )
+        except (OSError, subprocess.CalledProcessError):
+            cache.pop(path, None)
+            continue
+        match = re.search(r'version "([^"]+)"', result.stderr.decode(errors="replace"))
+        cache[path] = {"size": st.st_size, "mtime": st.st_mtime_ns, "version": match.group(1) if match else None}
+        found = path
+        break
+    write_json_atomic(JAVA_CACHE_PATH, cache)
+    return found
+
+def installer_version_ids(jar_path):
+    # Версии, которые создаст инсталлятор Forge/NeoForge: id из version.json и install_profile.json
+    version_ids = []
+    try:
+        with zipfile.ZipFile(jar_path) as z:
+            names = set(z.namelist())
+            if "version.json" in names:
+                version_ids.append(json.loads(z.read("version.json")).get("id"))
+            if "install_profile.json" in names:
+                profile = json.loads(z.read("install_profile.json"))
+                version_ids.append(profile.get("version"))
+                version_ids.append(profile.get("install", {}).get("target"))
+                version_ids.append(profile.get("versionInfo", {}).get("id"))
+    except (OSError, ValueError, AttributeError, zipfile.BadZipFile):
+        return []
+    return sorted({version_id for version_id in version_ids if isinstance(version_id, str) and version_id})
+
+def is_version_installed(versions_path, version_id):
+    # Версия установлена, если в versions/<id>/ лежит её <id>.json с тем же id
+    data = read_json_file(os.path.join(versions_path, version_id, f"{version_id}.json"))
+    return isinstance(data, dict) and data.get("id") == version_id
+
+def installed_version_ids(versions_path):
+    if not os.path.isdir(versions_path):
+        return set()
+    return {name for name in os.listdir(versions_path) if is_version_installed(versions_path, name)}
+
+def parse_server_list(text):
+    # server.txt: пары name=/ip=, по одной или несколько подряд (пустая строка между ними не обязательна)
+    servers = []
+    current = {}
+    for line in text.splitlines() + [""]:
+        line = line.strip()
+        key, _, value = line.partition("=")
+        if key not in ("name", "ip"):
+            if not line and "name" in current and "ip" in current:
+                servers.append((current["name"], current["ip"]))
+                current = {}
+            continue
+        if key in current:
+            if "name" in current and "ip" in current:
+                servers.append((current["name"], current["ip"]))
+            current = {}
+        current[key] = value.strip().strip('"')
+    return [(name, ip) for name, ip in servers if name and ip]
+
+def delete_mods_folder(minecraft_path):
+    mods_path = os.path.join(minecraft_path, "mods")
+    if os.path.exists(mods_path):
+        try:
+            shutil.rmtree(mods_path)
+        except Exception as e:
+            raise InstallError(f"Не удалось удалить папку mods: {e}")
+
+class Installer:
+    # Установка модпака без интерфейса. Окно и командная строка получают лог, прогресс
+    # и добавленные серверы через колбэки; ошибка установки — InstallError
+    def __init__(self, modpack_name, rename_mode=False, log=print, on_progress=None, on_servers_added=None,
+                 trace_path=None, profile_path=None):
+        check_modpack_name(modpack_name)
+        self.modpack_name = modpack_name
+        self.rename_mode = rename_mode
+        self.log = log
+        self.on_progress = on_progress
+        self.on_servers_added = on_servers_added
+        self.game_path = pack_game_path(modpack_name)
+        self.loader_lock = threading.Lock()
+        self.loader_thread = None
+        self.loader_error = None
+        self.loader_versions = None
+        self.archive_path = None
+        # Без явных путей трасса и профиль пишутся в TRACE_PATH, если включены настройками
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        if trace_path is None and TRACE_ENABLED:
+            trace_path = os.path.join(TRACE_PATH, f"{stamp}.json")
+        if profile_path is None and PROFILE_ENABLED:
+            profile_path = os.path.join(TRACE_PATH, f"{stamp}.prof")
+        self.trace_path = trace_path
+        self.profile_path = profile_path
+        self.tracer = Tracer()
+
+    def open_pack_source(self, plan):
+        if FETCH_MODE == "tree":
+            self.log("Запрос списка файлов модпака...")
+            with self.tracer.span("fetch_tree") as span:
+                blobs, truncated = fetch_modpack_tree(self.modpack_name)
+                span["files"] = len(blobs or ())
+            if blobs is None:
+                raise InstallError(f"Модпак '{self.modpack_name}' не найден в репозитории.")
+            remaining = get_session().remaining()
+            if truncated:
+                self.log("Список файлов обрезан GitHub, загружаем полный архив...")
+            elif remaining is not None and remaining < len(blobs) + RATE_LIMIT_RESERVE and not find_mirror():
+                self.log(f"Лимита запросов GitHub не хватит на все файлы (осталось {remaining}), "
+                         f"загружаем архив модпаков одним запросом...")
+            else:
+                total_size = sum(item.get("size", 0) for item in blobs)
+                self.log(f"Файлов в модпаке: {len(blobs)} ({total_size // (1024 * 1024)} МБ)")
+                mirror_url = find_mirror()
+                if mirror_url:
+                    self.log(f"Файлы берутся с зеркала {mirror_url}")
+                return TreePackSource(blobs, mirror_url)
+            # Дальше как в режиме zipball: у полосы прогресса появляется участок загрузки архива
+            self.progress_model.set_phases(ProgressModel.TREE_ARCHIVE_PHASES)
+
+        with self.tracer.span("resolve_commit") as span:
+            sha = span["sha"] = resolve_commit_sha()
+        manifest_source = self.open_manifest(sha, plan)
+        if manifest_source and not manifest_source.pending_files:
+            self.log("Все файлы модпака уже на месте, архив не нужен")
+            return manifest_source
+
+        # Запрос архива
+        self.log("Запрос архива модпаков...")
+        estimated_size = estimate_archive_size()
+        self.progress_model.start_phase("download", estimated_size, remote=True)
+
+        def on_download_progress(downloaded, total):
+            self.progress_model.set_downloaded(downloaded, total or max(estimated_size, downloaded))
+
+        path, from_cache = cached_archive_path(sha)
+        self.archive_path = path
+        if not from_cache:
+            mirror_url = find_mirror()
+            if not (mirror_url and self.fetch_from_mirror(mirror_url, sha, path, on_download_progress)):
+                self.stream_archive(f"{API_REPO_URL}/zipball/{sha}", path, plan, on_download_progress,
+                                    manifest_source)
+            evict_archive_cache(keep=path)
+        with self.tracer.span("archive_open", from_cache=from_cache) as span:
+            archive = MappedArchive(path)
+            archive_size = span["size"] = len(archive.mapped)
+        if from_cache:
+            self.log(f"Архив коммита {sha[:7]} взят из кэша ({archive_size // (1024 * 1024)} МБ)")
+        else:
+            self.log(f"Архив коммита {sha[:7]} загружен ({archive_size // (1024 * 1024)} МБ)")
+
+        with self.tracer.span("archive_index"):
+            if manifest_source:
+                source = manifest_source if manifest_source.attach(archive) else None
+            else:
+                source = open_zip_source(archive, self.modpack_name)
+        if source is None:
+            raise InstallError("Не удалось определить корневую папку архива.")
+        return source
+
+    def open_manifest(self, sha, plan):
+        # С манифестом модпака план готов до загрузки архива; None — установка без манифеста
+        try:
+            with self.tracer.span("manifest") as span:
+                manifest = fetch_manifest(self.modpack_name, sha)
+                span["found"] = manifest is not None
+                if manifest is None:
+                    return None
+                source = ManifestPackSource(manifest, self.modpack_name)
+        except (ManifestError, OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Манифест модпака не используется: {e}")
+            self.log(f"Манифест модпака не используется: {e}")
+            return None
+
+        source.pending_files = self.plan_files(plan, source)
+        roles = {}
+        for entry, _ in source.pending_files:
+            role = source.roles.get(entry.path, "other")
+            roles[role] = roles.get(role, 0) + 1
+        details = ", ".join(f"{role}: {count}" for role, count in sorted(roles.items()))
+        self.log(f"По манифесту нужно записать файлов: {len(source.pending_files)} из {len(source.entries)}"
+                 + (f" ({details})" if details else ""))
+        return source
+
+    def plan_files(self, plan, source):
+        # Какие файлы писать: [(запись, путь)]; инсталлятор загрузчика первым — он работает, пока пишутся остальные
+        pending_files = []
+        with self.tracer.span("plan", files=len(source.entries)) as span:
+            plan.prefetch_digests(source)
+            for entry in source.entries:
+                target_path = plan.target(source, entry)
+                if target_path and not self.is_loader_applied(source, entry) \
+                        and not self.is_servers_applied(source, entry):
+                    pending_files.append((entry, target_path))
+            span["pending"] = len(pending_files)
+        pending_files.sort(key=lambda item: not is_loader_installer(item[0].path))
+        return pending_files
+
+    def fetch_from_mirror(self, mirror_url, sha, path, on_progress):
+        # Архив с LAN-зеркала; False — зеркало не помогло, качаем с GitHub
+        self.log(f"Загрузка архива с зеркала {mirror_url}...")
+        try:
+            with self.tracer.span("mirror_download", url=mirror_url) as span:
+                fetch_mirror_archive(mirror_url, sha, path, on_progress, self.log)
+                span["size"] = os.path.getsize(path)
+        except (MirrorError, zipfile.BadZipFile, OSError) as e:
+            print(f"Зеркало не подошло: {e}")
+            self.log(f"Зеркало не подошло ({e}), загрузка с GitHub")
+            forget_mirror()
+            return False
+        self.tracer.count("mirror_bytes", span["size"])
+        self.log("Архив с зеркала сверен с репозиторием")
+        return True
+
+    def is_loader_applied(self, source, entry):
+        # Инсталлятор удаляется после запуска, поэтому на диске его нет; если известно по SHA блоба,
+        # какие версии он ставит, и они установлены — писать его заново не нужно
+        if not is_loader_installer(entry.path) or source.digest_kind != "git":
+            return False
+        version_ids = read_json_file(LOADER_CACHE_PATH).get(f"git:{entry.digest}")
+        versions_path = os.path.join(MINECRAFT_PATH, "versions")
+        if version_ids and all(is_version_installed(versions_path, version_id) for version_id in version_ids):
+            self.log(f"Версия '{', '.join(version_ids)}' уже установлена, инсталлятор не нужен")
+            self.loader_versions = version_ids
+            return True
+        return False
+
+    def is_servers_applied(self, source, entry):
+        # server.txt удаляется после установки, поэтому на диске его нет; тот же файл по SHA блоба
+        # уже добавлен в servers.dat — иначе из-за него одного качался бы весь архив
+        if entry.path != "server.txt" or source.digest_kind != "git":
+            return False
+        return applied_servers_sha(self.game_path) == entry.digest
+
+    def stream_archive(self, url, path, plan, on_progress, manifest_source=None):
+        # Файлы модпака распаковываются прямо во время загрузки архива
+        part_path = path + ".part"
+        stream = ArchiveStream()
+
+        def fetch():
+            # Распаковка идёт только по сплошному началу файла: при загрузке кусками оно меньше скачанного
+            with self.tracer.span("archive_download", url=url) as span:
+                resumed = span["resumed"] = fetch_archive_part(url, part_path, part_path + ".json",
+                                                               on_progress, self.log, stream.update)
+                span["size"] = os.path.getsize(part_path)
+            self.tracer.count("downloaded_bytes", span["size"])
+            return resumed
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="download") as downloader:
+            download = downloader.submit(fetch)
+            download.add_done_callback(stream.finish)
+            streamed = self.extract_while_downloading(part_path, stream, plan, manifest_source)
+            resumed = download.result()
+        if streamed:
+            self.log(f"Файлов записано во время загрузки: {streamed}")
+        with self.tracer.span("archive_check", resumed=resumed):
+            finish_archive_download(path, resumed)
+
+    def extract_while_downloading(self, part_path, stream, plan, manifest_source=None):
+        # С манифестом пишутся только файлы из готового плана, со сверкой SHA
+        wanted = None
+        if manifest_source:
+            wanted = {entry.path: (entry, target_path) for entry, target_path in manifest_source.pending_files}
+        prefix = None
+        streamed = 0
+        with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS, thread_name_prefix="stream") as pool:
+            futures = {}
+            for member in iter_streamed_members(part_path, stream):
+                if prefix is None:
+                    # Первая запись zipball — корневая папка "<владелец>-<репозиторий>-<sha>/"
+                    if not member.filename.endswith("/") or "/" in member.filename[:-1]:
+                        break
+                    prefix = f"{member.filename}modpacks/{self.modpack_name}/"
+                    continue
+                if not member.filename.startswith(prefix):
+                    continue
+                relative_path = member.filename[len(prefix):]
+                if wanted is not None:
+                    if relative_path not in wanted:
+                        continue
+                    source = manifest_source
+                    entry, target_path = wanted[relative_path]
+                    sha = entry.digest
+                else:
+                    source = ZipPackSource
+                    entry = PackEntry(relative_path, member.file_size, member.CRC)
+                    target_path = plan.target(source, entry)
+                    sha = None
+                    if target_path is None:
+                        continue
+                if not stream.wait_for(member.data_offset + member.compress_size):
+                    break
+                future = pool.submit(self.write_file, "write_streamed", entry, extract_streamed_member,
+                                     part_path, member, target_path, self.progress_model.add_written, sha)
+                self.watch_loader_installer(future, entry, target_path)
+                futures[future] = (source, entry, target_path)
+
+            try:
+                for future in as_completed(futures):
+                    source, entry, target_path = futures[future]
+                    try:
+                        future.result()
+                    except (zipfile.BadZipFile, zlib.error, BlobMismatchError):
+                        continue  # файл допишется из целого архива после загрузки
+                    plan.file_written(source, entry, target_path)
+                    self.progress_model.file_done()
+                    streamed += 1
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        return streamed
+
+    def write_file(self, span_name, entry, write, *args):
+        # Отдельный отрезок трассы на каждый файл: путь, размер и время записи
+        with self.tracer.span(span_name, path=entry.path, size=entry.size):
+            write(*args)
+        self.tracer.count("written_files")
+        self.tracer.count("written_bytes", entry.size)
+
+    def watch_loader_installer(self, future, entry, target_path):
+        # Инсталлятор загрузчика запускаем, как только он записан, не дожидаясь остальных файлов
+        if not is_loader_installer(entry.path):
+            return
+
+        def on_written(done):
+            if not done.cancelled() and done.exception() is None:
+                self.start_loader(target_path)
+        future.add_done_callback(on_written)
+
+    def start_loader(self, jar_path):
+        with self.loader_lock:
+            if self.loader_thread is not None:
+                return
+            self.loader_thread = threading.Thread(target=self.traced_install_loader, args=(jar_path,),
+                                                  name="loader", daemon=True)
+            self.loader_thread.start()
+
+    def traced_install_loader(self, jar_path):
+        # Исключение в потоке загрузчика не дошло бы до установки — она сообщила бы об успехе без версии
+        try:
+            with self.tracer.span("loader_install", jar=os.path.basename(jar_path)):
+                self.install_loader(jar_path)
+        except Exception as e:
+            self.loader_error = f"Ошибка установки модовой версии: {e}"
+
+    def install_loader(self, jar_path):
+        versions_path = os.path.dirname(jar_path)
+        installer_jar_name = os.path.basename(jar_path)
+
+        # Какие версии ставит этот инсталлятор: из кэша по хешу jar, из json внутри jar,
+        # в крайнем случае по имени файла (без "-installer.jar")
+        loader_cache = read_json_file(LOADER_CACHE_PATH)
+        jar_digest = sha256_file(jar_path)
+        version_ids = loader_cache.get(jar_digest) or installer_version_ids(jar_path)
+        if not version_ids:
+            version_ids = [installer_jar_name.replace("-installer.jar", "")]
+
+        if all(is_version_installed(versions_path, version_id) for version_id in version_ids):
+            # Версия уже установлена — запуска не делаем, просто удаляем инсталлятор
+            version_list = ", ".join(version_ids)
+            print(f"Версия '{version_list}' уже установлена, запуска инсталлятора не будет.")
+            self.log(f"Версия '{version_list}' уже установлена, запуска инсталлятора не будет.")
+            loader_cache[jar_digest] = version_ids
+            loader_cache[f"git:{git_blob_sha(jar_path)}"] = version_ids
+            write_json_atomic(LOADER_CACHE_PATH, loader_cache)
+            self.loader_versions = version_ids
+            try:
+                os.remove(jar_path)
+            except Exception as e:
+                print(f"Ошибка удаления инсталлятора: {e}")
+                self.log(f"Ошибка удаления инсталлятора: {e}")
+            return
+
+        with self.tracer.span("find_java"):
+            java_path = find_java()
+        if java_path is None:
+            self.loader_error = "Java не установлена или недоступна в переменной среды."
+            return
+
+        # Версии нет — запускаем инсталлятор
+        try:
+            versions_before = installed_version_ids(versions_path)
+            self.log(f"Запуск инсталлятора модовой версии '{installer_jar_name}'...")
+            with open(os.devnull, 'w') as devnull, self.tracer.span("loader_run", versions=version_ids):
+                subprocess.run(
+                    [java_path, "-jar", jar_path],
+                    stdout=devnull,
+                    stderr=devnull,
+                    creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+                )
+            # Запоминаем, что поставил инсталлятор, чтобы в следующий раз не запускать JVM
+            installed_ids = [version_id for version_id in version_ids if is_version_installed(versions_path, version_id)]
+            if len(installed_ids) != len(version_ids):
+                installed_ids = sorted(installed_version_ids(versions_path) - versions_before)
+            if installed_ids:
+                loader_cache[jar_digest] = installed_ids
+                loader_cache[f"git:{git_blob_sha(jar_path)}"] = installed_ids
+                write_json_atomic(LOADER_CACHE_PATH, loader_cache)
+                self.loader_versions = installed_ids
+            # После запуска удаляем инсталлятор
+            os.remove(jar_path)
+        except Exception as e:
+            print(f"Ошибка при запуске инсталлятора .jar: {e}")
+            self.log(f"Ошибка при запуске инсталлятора .jar: {e}")
+
+    def on_progress_update(self, snapshot):
+        if self.on_progress:
+            self.on_progress(snapshot)
+
+    def install(self):
+        # Возвращает итоговое сообщение; при ошибке — исключение. Трасса сохраняется в обоих случаях
+        profiler = None
+        if self.profile_path:
+            import cProfile
+            # cProfile видит только этот поток; потоки записи и загрузчика видны в трассе
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            with self.tracer.span("install", pack=self.modpack_name, rename_mode=self.rename_mode,
+                                  fetch_mode=FETCH_MODE, incremental=INCREMENTAL_SYNC):
+                try:
+                    return self.install_pack()
+                except (zipfile.BadZipFile, zlib.error) as e:
+                    # Повреждённый архив лежит в кэше по SHA коммита и ломал бы каждую следующую установку
+                    self.discard_archive()
+                    raise InstallError(f"Архив модпаков повреждён ({e}) и удалён из кэша, повторите установку.")
+        finally:
+            if profiler:
+                profiler.disable()
+                self.save_profile(profiler)
+            self.save_trace()
+
+    def discard_archive(self):
+        if not self.archive_path or not os.path.exists(self.archive_path):
+            return  # недокачанный архив уже убрал finish_archive_download
+        try:
+            os.remove(self.archive_path)
+            self.log(f"Повреждённый архив удалён из кэша: {self.archive_path}")
+        except OSError as e:
+            self.log(f"Не удалось удалить повреждённый архив {self.archive_path}: {e}")
+
+    def save_profile(self, profiler):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.profile_path)), exist_ok=True)
+            profiler.dump_stats(self.profile_path)
+            self.log(f"Профиль установки сохранён: {self.profile_path}")
+        except OSError as e:
+            self.log(f"Не удалось сохранить профиль установки: {e}")
+
+    def save_trace(self):
+        if not self.trace_path:
+            return
+        try:
+            self.tracer.save(self.trace_path, {
+                "pack": self.modpack_name,
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": sys.version.split()[0],
+                "platform": sys.platform,
+                "cpu_count": os.cpu_count(),
+                "fetch_mode": FETCH_MODE,
+                "extract_workers": EXTRACT_WORKERS,
+                "download_workers": DOWNLOAD_WORKERS,
+            })
+            if os.path.dirname(os.path.abspath(self.trace_path)) == os.path.abspath(TRACE_PATH):
+                prune_traces()
+            self.log(f"Трасса установки сохранена: {self.trace_path}")
+        except OSError as e:
+            self.log(f"Не удалось сохранить трассу установки: {e}")
+
+    def install_pack(self):
+        self.progress_model = ProgressModel(
+            self.on_progress_update,
+            ProgressModel.TREE_PHASES if FETCH_MODE == "tree" else ProgressModel.ZIPBALL_PHASES,
+            self.tracer,
+        )
+        self.progress_model.start_phase("prepare")
+        pack_tree = None
+        if PROFILE_MODE:
+            # Дерево модпака из свежего списка (сохранённый мог устареть, а проверка по ETag почти бесплатна):
+            # не изменилось с установки в профиль — только переключаемся
+            listing = load_modpack_list_cache()
+            with self.tracer.span("profile_check"):
+                try:
+                    listing, _ = fetch_modpack_list(listing)
+                except Exception as e:
+                    # Без сети установить всё равно не выйдет, а переключиться на профиль можно
+                    self.log(f"Не удалось обновить список модпаков, сверка по сохранённому: {e}")
+            listed = {pack["name"]: pack for pack in (listing or {}).get("packs", [])}
+            pack_tree = listed.get(self.modpack_name, {}).get("tree")
+            profile_state = read_json_file(PROFILES_STATE_PATH).get(self.modpack_name, {})
+            if pack_tree and profile_state.get("tree") == pack_tree and os.path.isdir(self.game_path):
+                with self.tracer.span("profile_switch"):
+                    register_launcher_profile(self.modpack_name, self.game_path, profile_state.get("versions"))
+                    save_installed_state(self.modpack_name)
+                self.progress_model.finish()
+                self.log(f"Модпак '{self.modpack_name}' не менялся, выбран его профиль лаунчера.")
+                return f"Модпак '{self.modpack_name}' не менялся, выбран его профиль лаунчера."
+
+        self.log("Резервное копирование/удаление папки mods, если необходимо...")
+        hash_index = HashIndex(HASH_INDEX_PATH)
+
+        if self.rename_mode:
+            store = BackupStore(self.game_path)
+            with self.tracer.span("backup") as span:
+                snapshot, new_objects = store.create_snapshot(
+                    os.path.join(self.game_path, "mods"), load_installed_state().get("pack"), hash_index
+                )
+                span["new_objects"] = new_objects
+            if snapshot:
+                self.log(f"Резервная копия mods {snapshot['id']} сохранена "
+                         f"(файлов: {len(snapshot['files'])}, новых: {new_objects})")
+            else:
+                self.log("Папка mods не изменилась с прошлой резервной копии")
+            removed_snapshots = store.apply_retention()
+            if removed_snapshots:
+                self.log(f"Старых резервных копий удалено: {removed_snapshots}")
+            if not INCREMENTAL_SYNC:
+                delete_mods_folder(self.game_path)
+                self.log("Папка mods удалена")
+        elif INCREMENTAL_SYNC:
+            self.log("Папка mods будет синхронизирована с модпаком")
+        else:
+            delete_mods_folder(self.game_path)
+            self.log("Папка mods удалена")
+        
+        if FETCH_MODE == "tree":
+            self.progress_model.start_phase("listing", remote=True)
+        link_roots = ()
+        if PROFILE_MODE:
+            link_roots = [path for path in game_paths() if os.path.normcase(path) != os.path.normcase(self.game_path)]
+        plan = InstallPlan(self.game_path, hash_index, link_roots)
+        source = self.open_pack_source(plan)
+
+        with source:
+            file_list = source.entries
+            found = bool(file_list)
+
+            if source.pending_files is not None:
+                # План по манифесту уже готов; часть файлов могла записаться во время загрузки
+                pending_files = [item for item in source.pending_files if item[0].path not in plan.written_paths]
+            else:
+                pending_files = self.plan_files(plan, source)
+
+            # Файлы пишутся пулом потоков: распаковка zip или параллельная загрузка в режиме "tree"
+            self.progress_model.start_phase(
+                "extract",
+                total_bytes=sum(entry.size for entry, _ in pending_files),
+                total_files=len(pending_files),
+                remote=isinstance(source, TreePackSource),
+            )
+            with ThreadPoolExecutor(max_workers=source.max_workers, thread_name_prefix="write") as pool:
+                futures = {}
+                for entry, target_path in pending_files:
+                    future = pool.submit(self.write_file, "write_file", entry, extract_file,
+                                         source, entry, target_path, self.progress_model.add_written, self.log)
+                    self.watch_loader_installer(future, entry, target_path)
+                    futures[future] = (entry, target_path)
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                        entry, target_path = futures[future]
+                        plan.file_written(source, entry, target_path)
+                        self.progress_model.file_done()
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+            def format_worlds_list(worlds_set):
+                worlds = [w.strip() for w in worlds_set if w.strip()]
+                return ", ".join(worlds) if worlds else "нет"
+            
+            def log_worlds_action(log_func, worlds_set, action_singular, action_plural):
+                worlds = [w.strip() for w in worlds_set if w.strip()]
+                if not worlds:
+                    return 
+
+                if len(worlds) == 1:
+                    log_func(f"Мир {worlds[0]} {action_singular}")
+                else:
+                    log_func(f"Миры {', '.join(worlds)} {action_plural}")
+
+            self.log(f"Текущие миры модпака: {format_worlds_list(plan.world_names)}")
+
+            existing_worlds = plan.existing_worlds
+            if existing_worlds:
+                if WORLD_SYNC:
+                    log_worlds_action(self.log, existing_worlds, "обновлён по файлам", "обновлены по файлам")
+                else:
+                    log_worlds_action(self.log, existing_worlds, "пропущен", "пропущены")
+
+            worlds_to_download = plan.world_names - existing_worlds
+            if worlds_to_download:
+                log_worlds_action(self.log, worlds_to_download, "добавлен", "добавлены")
+
+            if existing_worlds:
+                filtered_worlds = [w.strip() for w in existing_worlds if w.strip()]
+                if filtered_worlds:
+                    print(f"Текущие существующие миры из сборки: {', '.join(filtered_worlds)}")
+                    self.log("Текущие существующие миры из сборки: " + ", ".join(filtered_worlds))
+                if WORLD_SYNC:
+                    for world_name in sorted(existing_worlds):
+                        self.log(f"Мир {world_name}: обновлено файлов {plan.world_updates.get(world_name, 0)}")
+                    if plan.protected_files:
+                        self.log(f"Файлов игрока в мирах оставлено без изменений: {plan.protected_files}")
+
+            if not found:
+                hash_index.save()
+                raise InstallError(f"Модпак '{self.modpack_name}' не найден в архиве.")
+
+            if isinstance(source, TreePackSource) and source.mirror_files:
+                self.log(f"Файлов взято с зеркала: {source.mirror_files}")
+            if INCREMENTAL_SYNC:
+                self.log(f"Файлов без изменений: {plan.unchanged_files}, записано: {plan.written_files}")
+                mods_path = os.path.join(self.game_path, "mods")
+                pack_mods = {item.path[len("mods/"):] for item in file_list if item.path.startswith("mods/")}
+                if os.path.isdir(mods_path):
+                    with self.tracer.span("remove_stale") as span:
+                        removed = span["removed"] = remove_stale_files(mods_path, pack_mods)
+                    self.log(f"Лишних модов удалено: {removed}")
+            if plan.linked_files:
+                self.log(f"Файлов взято жёсткой ссылкой у других модпаков: {plan.linked_files}")
+            with self.tracer.span("save_state"):
+                hash_index.save()
+                save_installed_state(self.modpack_name)
+
+        self.progress_model.start_phase("loader")
+        if self.loader_thread is None:
+            # Инсталлятор не менялся или остался с прошлого раза — ищем jar с "-installer.jar" в versions
+            versions_path = os.path.join(MINECRAFT_PATH, "versions")
+            for jar_path in glob.glob(os.path.join(versions_path, "*.jar")):
+                if jar_path.endswith("-installer.jar"):
+                    self.start_loader(jar_path)
+                    break
+
+        if self.loader_thread is None:
+            print("Инсталлятор не найден, запуск пропущен.")
+            self.log("Инсталлятор не найден, запуск пропущен.")
+        else:
+            with self.tracer.span("loader_wait"):
+                self.loader_thread.join()
+            if self.loader_error:
+                raise InstallError(self.loader_error)
+
+        self.progress_model.start_phase("servers")
+        server_txt_path = os.path.join(self.game_path, "server.txt")
+        if os.path.exists(server_txt_path):
+            try:
+                with open(server_txt_path, "r", encoding="utf-8") as f:
+                    servers = parse_server_list(f.read())
+                if servers:
+                    # Серверы добавляются без UI, сообщение покажет главный поток
+                    with self.tracer.span("servers_update", servers=len(servers)) as span:
+                        added = self.add_servers(servers)
+                        span["added"] = len(added or ())
+                    if added is not None:
+                        save_applied_servers(self.game_path, git_blob_sha(server_txt_path))
+                    if added and self.on_servers_added:
+                        self.on_servers_added(added)
+                else:
+                    print("Неверный формат в server.txt")
+                    self.log("Неверный формат в server.txt")
+            except Exception as e:
+                print(f"Ошибка обработки server.txt: {e}")
+                self.log(f"Ошибка обработки server.txt: {e}")
+            finally:
+                os.remove(server_txt_path)
+
+        if PROFILE_MODE:
+            # Версию профиля знает инсталлятор; если его в этот раз не было — берём прошлую
+            versions = self.loader_versions or read_json_file(PROFILES_STATE_PATH).get(self.modpack_name, {}).get("versions")
+            with self.tracer.span("profile_register"):
+                register_launcher_profile(self.modpack_name, self.game_path, versions)
+                profiles_state = read_json_file(PROFILES_STATE_PATH)
+                profiles_state[self.modpack_name] = {"tree": pack_tree, "versions": versions, "installed": time.time()}
+                write_json_atomic(PROFILES_STATE_PATH, profiles_state)
+            self.progress_model.finish()
+            self.log(f"Модпак '{self.modpack_name}' установлен в профиль лаунчера ({self.game_path}).")
+            return f"Модпак '{self.modpack_name}' установлен в профиль лаунчера."
+
+        self.progress_model.finish()
+        self.log(f"Модпак '{self.modpack_name}' установлен в .minecraft.")
+        return f"Модпак '{self.modpack_name}' установлен в .minecraft."
+
+
+    def add_servers(self, servers):
+        # Все серверы модпака — одним чтением и одной записью servers.dat.
+        # Возвращает добавленные серверы или None, если servers.dat не прочитался
+        import nbtlib
+        from nbtlib import tag
+
+        servers_path = os.path.join(self.game_path, "servers.dat")
+
+        if not os.path.exists(servers_path):
+            servers_data = nbtlib.File({
+                "servers": tag.List[nbtlib.Compound]()
+            })
+        else:
+            try:
+                servers_data = nbtlib.load(servers_path)
+            except Exception as e:
+                print(f"Ошибка чтения servers.dat: {e}")
+                self.log(f"Ошибка чтения servers.dat: {e}")
+                return None  # серверы не добавлены — server.txt не считается применённым
+        root = getattr(servers_data, "root", servers_data)
+
+        saved_servers = root.get("servers", tag.List[nbtlib.Compound]())
+        known_ips = {str(server.get("ip", "")).strip().lower() for server in saved_servers}
+
+        added = []
+        for name, ip in servers:
+            ip_key = ip.strip().lower()
+            if ip_key in known_ips:
+                print(f"Сервер '{ip}' уже существует в списке.")
+                self.log(f"Сервер '{ip}' уже существует в списке.")
+                continue
+            known_ips.add(ip_key)
+            saved_servers.append(nbtlib.Compound({
+                "acceptTextures": tag.Byte(1),
+                "hidden": tag.Byte(0),
+                "ip": tag.String(ip),
+                "name": tag.String(name)
+            }))
+            added.append((name, ip))
+
+        if not added:
+            return added  # ничего не изменилось — файл не трогаем
+        root["servers"] = saved_servers
+
+        # Через временный файл: при сбое во время записи старый servers.dat останется целым
+        tmp_path = servers_path + ".tmp"
+        servers_data.save(tmp_path)
+        os.replace(tmp_path, servers_path)
+        return added
+
+    def verify(self):
+        # Сверка установленных файлов с модпаком без записи; для списка хватает Git trees API
+        self.log("Запрос списка файлов модпака...")
+        blobs, truncated = fetch_modpack_tree(self.modpack_name)
+        if blobs is None:
+            raise InstallError(f"Модпак '{self.modpack_name}' не найден в репозитории.")
+        if not truncated:
+            source = TreePackSource(blobs)
+        else:
+            self.log("Список файлов обрезан GitHub, загружаем полный архив...")
+            sha = resolve_commit_sha()
+            path, from_cache = cached_archive_path(sha)
+            if not from_cache:
+                download_archive(f"{API_REPO_URL}/zipball/{sha}", path, log=self.log)
+                evict_archive_cache(keep=path)
+            source = open_zip_source(MappedArchive(path), self.modpack_name)
+            if source is None:
+                raise InstallError("Не удалось определить корневую папку архива.")
+
+        hash_index = HashIndex(HASH_INDEX_PATH)
+        report = {"pack": self.modpack_name, "checked": 0, "missing": [], "changed": [], "extra_mods": []}
+        with source:
+            for entry in source.entries:
+                relative_path = entry.path
+                # Инсталлятор и server.txt удаляются после установки, файлы игрока в мирах свои
+                if relative_path.endswith("/") or relative_path in ("server.txt", MANIFEST_NAME) \
+                        or is_loader_installer(relative_path):
+                    continue
+                if relative_path.startswith("saves/") and relative_path.count("/") > 1 \
+                        and is_world_file_protected(relative_path.split("/", 2)[2]):
+                    continue
+                report["checked"] += 1
+                target_path = pack_file_path(self.game_path, relative_path)
+                if not os.path.isfile(target_path):
+                    report["missing"].append(relative_path)
+                elif not is_file_current(source, entry, target_path, hash_index):
+                    report["changed"].append(relative_path)
+
+            mods_path = os.path.join(self.game_path, "mods")
+            pack_mods = {item.path[len("mods/"):] for item in source.entries if item.path.startswith("mods/")}
+            for dirpath, _, filenames in os.walk(mods_path):
+                for filename in filenames:
+                    relative_path = os.path.relpath(os.path.join(dirpath, filename), mods_path).replace(os.sep, "/")
+                    if relative_path not in pack_mods:
+                        report["extra_mods"].append(relative_path)
+        hash_index.save()
+        self.log(f"Проверено файлов: {report['checked']}, нет: {len(report['missing'])}, "
+                 f"изменено: {len(report['changed'])}, лишних модов: {len(report['extra_mods'])}")
+        return report
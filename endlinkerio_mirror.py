@@ -0,0 +1,169 @@
+import os
+import re
+import json
+import socket
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+import endlinkerio_core as core
+
+# LAN-зеркало: отдаёт по HTTP архивы коммитов из кэша и файлы установленного модпака
+# и отвечает на широковещательный поиск по UDP. Клиенты сверяют всё полученное с хешами
+# из репозитория, поэтому зеркалу не нужен токен:
+#   python endlinkerio_cli.py mirror
+# или MIRROR_SERVE = True в endlinkerio_core.py, чтобы зеркало запускалось вместе с окном
+
+SEND_CHUNK_SIZE = 1024 * 1024
+ARCHIVE_NAME = re.compile(r"[0-9a-f]{40}\.zip")
+BLOB_SHA = re.compile(r"[0-9a-f]{40}")
+
+class MirrorServer:
+    def __init__(self, port=None, log=print):
+        self.port = core.MIRROR_PORT if port is None else port
+        self.log = log
+        # Хеши файлов .minecraft только читаются: индекс установки зеркало не перезаписывает
+        self.hash_index = core.HashIndex(core.HASH_INDEX_PATH)
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "bytes": 0}
+        self.http = None
+        self.udp = None
+
+    def start(self):
+        self.http = ThreadingHTTPServer(("", self.port), make_handler(self))
+        self.http.daemon_threads = True
+        self.port = self.http.server_address[1]
+        threading.Thread(target=self.http.serve_forever, name="mirror-http", daemon=True).start()
+
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.udp.bind(("", core.MIRROR_DISCOVERY_PORT))
+        threading.Thread(target=self.answer_discovery, name="mirror-discovery", daemon=True).start()
+        self.log(f"Зеркало модпаков запущено на порту {self.port}")
+        return self
+
+    def stop(self):
+        if self.http:
+            self.http.shutdown()
+            self.http.server_close()
+        if self.udp:
+            self.udp.close()
+
+    def answer_discovery(self):
+        reply = json.dumps({
+            "app": core.MIRROR_APP_ID,
+            "repo": core.GITHUB_REPO,
+            "instance": core.INSTANCE_ID,
+            "port": self.port,
+        }).encode()
+        while True:
+            try:
+                data, address = self.udp.recvfrom(1024)
+            except OSError:
+                return  # сокет закрыт в stop()
+            try:
+                request = json.loads(data)
+            except ValueError:
+                continue
+            # Отвечаем только своим: тот же репозиторий модпаков
+            if isinstance(request, dict) and request.get("app") == core.MIRROR_APP_ID \
+                    and request.get("repo") == core.GITHUB_REPO:
+                try:
+                    self.udp.sendto(reply, address)
+                except OSError:
+                    pass
+
+    def archive_path(self, name):
+        if not ARCHIVE_NAME.fullmatch(name):
+            return None
+        path = os.path.join(core.ARCHIVE_CACHE_PATH, name)
+        return path if os.path.isfile(path) else None
+
+    def blob_path(self, sha, relative_path):
+        # Файл из .minecraft (или из папки профиля модпака) отдаётся, только если его SHA блоба
+        # совпал с запрошенным: так наружу не уходит ничего, кроме файлов модпаков
+        if not BLOB_SHA.fullmatch(sha) or not relative_path:
+            return None
+        for game_path in core.game_paths():
+            game_path = os.path.realpath(game_path)
+            path = os.path.realpath(os.path.join(game_path, relative_path))
+            if os.path.commonpath([game_path, path]) != game_path or not os.path.isfile(path):
+                continue
+            try:
+                # Словарь индекса меняется под GIL; в худшем случае файл посчитается дважды
+                digest = self.hash_index.digest(path, "git", core.git_blob_sha)
+            except OSError:
+                continue
+            if digest == sha:
+                return path
+        return None
+
+    def count(self, sent_bytes=0, requests=0):
+        with self.stats_lock:
+            self.stats["bytes"] += sent_bytes
+            self.stats["requests"] += requests
+
+def make_handler(mirror):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send_empty(self, code, headers=()):
+            self.send_response(code)
+            self.send_header("Content-Length", "0")
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+
+        def send_file(self, path, etag):
+            # Range нужен для докачки архива после обрыва (download_part в endlinkerio_core).
+            # Куски bytes=начало-конец — для загрузки в несколько соединений (download_segmented)
+            size = os.path.getsize(path)
+            start, end = 0, size - 1
+            match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+            if match and self.headers.get("If-Range") in (None, etag):
+                start = int(match.group(1))
+                if match.group(2):
+                    end = min(end, int(match.group(2)))
+                if start >= size or start > end:
+                    return self.send_empty(416, [("Content-Range", f"bytes */{size}")])
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(end + 1 - start))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            with open(path, "rb") as f:
+                f.seek(start)
+                remaining = end + 1 - start
+                while remaining:
+                    chunk = f.read(min(SEND_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+                    mirror.count(len(chunk))
+
+        def do_GET(self):
+            mirror.count(requests=1)
+            url = urlparse(self.path)
+            kind, _, name = unquote(url.path).strip("/").partition("/")
+            try:
+                if kind == "archives":
+                    path = mirror.archive_path(name)
+                    if path:
+                        mirror.log(f"Архив {name[:7]} отдаётся на {self.client_address[0]}")
+                        return self.send_file(path, f'"{name[:-len(".zip")]}"')
+                elif kind == "blobs":
+                    path = mirror.blob_path(name, parse_qs(url.query).get("path", [""])[0])
+                    if path:
+                        return self.send_file(path, f'"{name}"')
+                self.send_empty(404)
+            except OSError:
+                pass  # клиент отключился посреди передачи
+
+    return Handler